@@ -1,15 +1,227 @@
+import hashlib
+import io
+import os
+import pandas as pd
 import streamlit as st
-from data_processor import TallyDataProcessor
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from data_processor import TallyDataProcessor, DEFAULT_CHUNK_SIZE
 from dashboard import Dashboard
+from cache import ProcessedCache
+from catalog import ProductCatalog
+from buyers import current_aliases
+from ingest import IngestJob
+from instrumentation import Profiler, trace_memory
+from store import STORE_FILE, SalesStore
 
 # Page config
 st.set_page_config(page_title="Tally Sales Dashboard", layout="wide", initial_sidebar_state="expanded")
 
+# Uploads above this size are ingested in row chunks to bound memory
+STREAMING_THRESHOLD_BYTES = 25 * 1024 * 1024
+
+# Saved datasets that new periods can be appended to
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".datasets")
+
+@st.cache_resource
+def get_cache():
+    """Process-wide cache of processed registers, shared by every session"""
+    return ProcessedCache()
+
+
+def upload_digests(uploaded_files):
+    """SHA-256 of each upload, hashed once per uploaded file rather than on every rerun"""
+    known = st.session_state.get('upload_digests', {})
+    digests = {
+        f.file_id: known.get(f.file_id) or hashlib.sha256(f.getvalue()).digest()
+        for f in uploaded_files
+    }
+    # Files removed from the uploader are forgotten
+    st.session_state['upload_digests'] = digests
+    return [digests[f.file_id] for f in uploaded_files]
+
+
+def hold(handle):
+    """Keep this session's reference on a shared dataset (releasing the previous one)"""
+    st.session_state['dataset_handle'] = handle
+    return handle
+
+
+def render_dashboard(df, stats, cube, profiler=None):
+    """Render KPI cards and the selected analysis view for a processed dataset"""
+    rows = len(df) if df is not None else stats.get('total_transactions', 0)
+    st.success(f"✅ Successfully loaded **{rows}** transactions!")
+    if stats.get('duplicates_removed'):
+        st.info(f"🧹 Removed **{stats['duplicates_removed']}** duplicate lines found in more than one file")
+    if stats.get('value_parse_failures'):
+        st.warning(f"⚠️ **{stats['value_parse_failures']}** value cells could not be read as amounts and were skipped")
+    if stats.get('negative_values_dropped'):
+        st.warning(f"⚠️ **{stats['negative_values_dropped']}** rows with a negative amount (e.g. credit notes) were left out")
+    if stats.get('date_parse_failures'):
+        st.warning(f"⚠️ **{stats['date_parse_failures']}** date cells could not be read and were filled from the row above")
+    if df is not None:
+        st.sidebar.caption(f"💾 Dataset in memory: {stats.get('memory_bytes', 0) / 1024 ** 2:.1f} MB")
+    else:
+        st.sidebar.caption(f"🗄️ Dataset queried from disk: {cube.size_bytes() / 1024 ** 2:.1f} MB")
+    
+    # Initialize Dashboard
+    dashboard = Dashboard(df, stats, cube, profiler=profiler)
+    
+    # Render KPI Cards
+    dashboard.render_kpi_cards()
+    
+    # Only the selected view is computed (st.tabs would render all five on every run)
+    views = {
+        "📈 Sales Trends": dashboard.render_sales_trend,
+        "🗺️ State Analysis": dashboard.render_state_analysis,
+        "🏢 Buyer Analytics": dashboard.render_buyer_analysis,
+        "🔧 Product Performance": dashboard.render_product_analysis,
+        "📋 Data Table": dashboard.render_data_table
+    }
+    view = st.radio("View", list(views), horizontal=True, label_visibility="collapsed", key="dashboard_view")
+    views[view]()
+    
+    # Footer
+    st.markdown("---")
+    st.caption("📊 CMPL Sales Dashboard | Data processed from Tally Export")
+
+
+def dataset_name_error(name):
+    """Why a name cannot be used as a dataset folder, or None when it can"""
+    if not name:
+        return "Enter a dataset name"
+    if '/' in name or '\\' in name or name in ('.', '..') or os.path.basename(name) != name:
+        return "Dataset names cannot contain path separators or be '.' or '..'"
+    return None
+
+
+def list_datasets():
+    """Names of saved datasets"""
+    if not os.path.isdir(DATASETS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(DATASETS_DIR)
+        if os.path.exists(os.path.join(DATASETS_DIR, name, 'aggregates.pkl'))
+    )
+
+
+def load_dataset(name, version):
+    """Handle on a saved dataset in the shared registry; version is the file mtime so appends invalidate it"""
+    registry = get_cache().registry
+    key = f"dataset:{name}:{version}"
+    handle = registry.acquire(key)
+    if handle is None:
+        processor = TallyDataProcessor.open_dataset(os.path.join(DATASETS_DIR, name))
+        handle = registry.register(key, processor.df, processor.stats, processor.cube)
+    return handle
+
+
+@st.cache_resource(max_entries=4)
+def open_store(name, version):
+    """Open a saved dataset's query store; the rows stay on disk"""
+    return SalesStore(os.path.join(DATASETS_DIR, name, STORE_FILE))
+
+
+def render_saved_dataset(profiler=None):
+    """Show a saved dataset and let the user append a new period to it"""
+    datasets = list_datasets()
+    if not datasets:
+        st.info("No saved datasets yet. Upload registers and use **💾 Save as Dataset** in the sidebar.")
+        return
+    
+    name = st.selectbox("🗂️ Dataset", datasets)
+    directory = os.path.join(DATASETS_DIR, name)
+    
+    new_file = st.file_uploader(
+        "➕ Append a new period",
+        type=["xlsx", "xls", "xml"],
+        help="Rows dated inside the new file's date range replace the ones already stored"
+    )
+    
+    try:
+        if new_file is not None and st.button("Append to dataset"):
+            with st.spinner("🔍 Merging new period... Please wait"):
+                processor = TallyDataProcessor.open_dataset(directory)
+                processor.append(io.BytesIO(new_file.getvalue()))
+                processor.save(directory, store=os.path.exists(os.path.join(directory, STORE_FILE)))
+            st.success(f"✅ Appended **{new_file.name}** to '{name}'")
+        
+        version = os.path.getmtime(os.path.join(directory, 'aggregates.pkl'))
+        if SalesStore.is_current(os.path.join(directory, STORE_FILE)) and st.sidebar.checkbox(
+            "🗄️ Query from disk", value=True, help="Serve charts and table pages from the on-disk store instead of loading every row"
+        ):
+            store = open_store(name, version)
+            render_dashboard(None, store.stats, store, profiler)
+        else:
+            handle = hold(load_dataset(name, version))
+            render_dashboard(handle.df, handle.stats, handle.cube, profiler)
+        
+    except Exception as e:
+        st.error(f"❌ Error processing file: {str(e)}")
+
+
+def wait_for_ingest(job):
+    """Show live stage progress until the background job finishes; returns its handle"""
+    bar = st.progress(job.progress, text="⏳ Starting...")
+    while not job.finished.wait(0.25):
+        rows = f" · {job.rows:,} rows" if job.rows else ""
+        bar.progress(job.progress, text=f"⏳ {job.label}{rows} · {job.elapsed():.0f}s")
+    bar.empty()
+    
+    if job.error:
+        raise Exception(job.error)
+    return job.handle
+
+
+def render_registry_usage():
+    """Sidebar indicator for the shared dataset registry"""
+    usage = get_cache().registry.usage()
+    st.sidebar.caption(
+        f"🧠 Shared datasets: {usage['entries']} ({usage['in_use']} in use) · "
+        f"{usage['bytes'] / 1024 ** 2:,.0f} / {usage['max_bytes'] / 1024 ** 2:,.0f} MB · "
+        f"{usage['hits']} hits / {usage['misses']} misses"
+    )
+
+
+def render_diagnostics(profiler, panel, log):
+    """Per-stage timings for this run in the sidebar, optionally appended to the log"""
+    summary = profiler.summary()
+    with panel:
+        st.markdown("### 🩺 Diagnostics")
+        if not summary:
+            st.caption("No stages recorded in this run")
+            return
+        
+        table = pd.DataFrame(summary)
+        table['ms'] = (table['seconds'] * 1000).round(1)
+        # Traced memory is sampled for the whole process (all sessions) at each stage's start and end
+        table['delta_MB'] = (table['memory_bytes'].astype(float) / 1024 ** 2).round(2)
+        table['peak_MB'] = (table['peak_bytes'].astype(float) / 1024 ** 2).round(2)
+        st.dataframe(table[['stage', 'calls', 'ms', 'delta_MB', 'peak_MB', 'rows']], use_container_width=True, hide_index=True)
+        st.caption(
+            f"Total: {table['seconds'].sum() * 1000:,.0f} ms · delta/peak_MB: change in the app process's traced memory "
+            "over the stage, and its peak above the stage start (blank unless the process reached a new high)"
+        )
+    
+    if log:
+        profiler.write_log(session=get_script_run_ctx().session_id if get_script_run_ctx() else None)
+
+
 # ---------- MAIN DASHBOARD (NO LOGIN) ----------
 def main():
     # Sidebar info only (no login)
     st.sidebar.title("📊 Tally Dashboard")
-    st.sidebar.info("Upload Excel to view analytics")
+    st.sidebar.info("Upload Excel files to view analytics")
+    
+    # Optional per-stage instrumentation (no overhead when off)
+    show_diagnostics = st.sidebar.toggle("🩺 Diagnostics", value=False)
+    log_diagnostics = show_diagnostics and st.sidebar.checkbox("Append to diagnostics log")
+    # The token keeps memory tracing on; it is released when dropped or when the session ends
+    if not show_diagnostics:
+        st.session_state.pop('memory_trace', None)
+    elif 'memory_trace' not in st.session_state:
+        st.session_state['memory_trace'] = trace_memory()
+    profiler = Profiler(enabled=show_diagnostics)
+    diagnostics_panel = st.sidebar.container() if show_diagnostics else None
     st.sidebar.markdown("---")
     
     # Main Title
@@ -17,66 +229,81 @@ def main():
     st.markdown("### Upload your Tally GST Sales Register Excel file")
     st.markdown("---")
     
+    # Fresh uploads or a saved dataset that grows month by month
+    source = st.sidebar.radio("Data source", ["Upload registers", "Saved dataset"])
+    if source == "Saved dataset":
+        render_saved_dataset(profiler)
+        render_registry_usage()
+        if show_diagnostics:
+            render_diagnostics(profiler, diagnostics_panel, log_diagnostics)
+        return
+    
     # File Upload Section
-    uploaded_file = st.file_uploader(
-        "📁 Choose Excel File",
-        type=["xlsx", "xls"],
-        help="Upload the Excel file exported from Tally GST Sales Register"
+    uploaded_files = st.file_uploader(
+        "📁 Choose Excel or Tally XML Files",
+        type=["xlsx", "xls", "xml"],
+        accept_multiple_files=True,
+        help="Upload one or more GST Sales Register exports from Tally, as Excel or XML (e.g. one per month or branch); the format is detected from the file contents"
     )
 
-    if uploaded_file is not None:
+    if uploaded_files:
         try:
-            with st.spinner("🔍 Processing data... Please wait"):
-                # Save temporarily
-                with open("temp_data.xlsx", "wb") as f:
-                    f.write(uploaded_file.getvalue())
-                
-                # Process the data
-                processor = TallyDataProcessor("temp_data.xlsx")
-                df = processor.load_and_process()
-                stats = processor.get_summary_stats()
-                
-                if df is not None and not df.empty:
-                    st.success(f"✅ Successfully loaded **{len(df)}** transactions!")
-                    
-                    # Initialize Dashboard
-                    dashboard = Dashboard(df, stats)
-                    
-                    # Render KPI Cards
-                    dashboard.render_kpi_cards()
-                    
-                    # Create tabs for different views
-                    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-                        "📈 Sales Trends", 
-                        "🗺️ State Analysis", 
-                        "🏢 Buyer Analytics", 
-                        "🔧 Product Performance", 
-                        "📋 Data Table"
-                    ])
-                    
-                    with tab1:
-                        dashboard.render_sales_trend()
-                    
-                    with tab2:
-                        dashboard.render_state_analysis()
-                    
-                    with tab3:
-                        dashboard.render_buyer_analysis()
-                    
-                    with tab4:
-                        dashboard.render_product_analysis()
-                    
-                    with tab5:
-                        dashboard.render_data_table()
-                        
-                    # Footer
-                    st.markdown("---")
-                    st.caption("📊 CMPL Sales Dashboard | Data processed from Tally Export")
+            # Reuse a previously processed copy of the same uploads (in any order) and catalog
+            cache = get_cache()
+            catalog = ProductCatalog.load()
+            digests = sorted(upload_digests(uploaded_files))
+            cache_key = cache.key_from_digests(hashlib.sha256(catalog.fingerprint().encode()).digest(), *digests)
+            with profiler.stage('cache_lookup'):
+                handle = cache.get(cache_key)
+            
+            if handle is None:
+                # Processing runs on a background thread that outlives reruns of this script
+                job = st.session_state.get('ingest_job')
+                if job is None or job.key != cache_key:
+                    if job is not None:
+                        job.cancel()
                     
-                else:
-                    st.error("❌ No valid data found in the uploaded file!")
-                    st.info("💡 Tip: Make sure you're uploading the GST Sales Register from Tally")
+                    # Each job reads its own buffers over the uploaded bytes, which are never copied
+                    blobs = [f.getvalue() for f in uploaded_files]
+                    buffers = [io.BytesIO(data) for data in blobs]
                     
+                    # Process the data (files are parsed in parallel)
+                    large = max(len(data) for data in blobs) > STREAMING_THRESHOLD_BYTES
+                    chunk_size = DEFAULT_CHUNK_SIZE if large else None
+                    job = IngestJob(cache_key, buffers, cache, chunk_size, catalog, Profiler(enabled=show_diagnostics))
+                    st.session_state['ingest_job'] = job.start()
+                
+                handle = wait_for_ingest(job)
+                profiler.extend(job.profiler.records)
+                if handle is not None:
+                    # The session keeps only its reference on the shared dataset
+                    del st.session_state['ingest_job']
+                    st.sidebar.caption(f"⚡ Ready in {job.stats_ready_seconds:.1f}s")
+            
+            if handle is not None:
+                # Buyer names follow hand edits to the alias table made since processing
+                handle = cache.resolve_buyers(handle, current_aliases())
+                df, stats, cube = hold(handle).df, handle.stats, handle.cube
+                render_dashboard(df, stats, cube, profiler)
+                
+                # Keep this upload as a dataset that later months can be appended to
+                with st.sidebar.expander("💾 Save as Dataset"):
+                    name = st.text_input("Dataset name", value="sales")
+                    with_store = st.checkbox("Build on-disk query store", help="Lets the dataset be served without loading every row")
+                    if st.button("Save"):
+                        name = name.strip()
+                        error = dataset_name_error(name)
+                        if error:
+                            st.error(f"❌ {error}")
+                        else:
+                            processor = TallyDataProcessor.from_processed(df, stats, cube)
+                            processor.save(os.path.join(DATASETS_DIR, name), store=with_store)
+                            st.success(f"Saved dataset '{name}'")
+                
+            else:
+                st.error("❌ No valid data found in the uploaded file!")
+                st.info("💡 Tip: Make sure you're uploading the GST Sales Register from Tally")
+                
         except Exception as e:
             st.error(f"❌ Error processing file: {str(e)}")
             st.info("💡 Expected columns: Date, Particulars/Buyer, State, Value/Amount")
@@ -86,7 +313,7 @@ def main():
         st.info("👆 **Getting Started:**")
         st.markdown("""
         1. Open **Tally** → Go to **GST Sales Register**
-        2. Click **Export** → Select **Excel** format
+        2. Click **Export** → Select **Excel** or **XML** format (XML loads faster)
         3. Upload the file here using the button above
         4. View interactive charts and analytics!
         """)
@@ -102,6 +329,10 @@ def main():
             
             The dashboard will automatically detect and clean the data.
             """)
+    
+    render_registry_usage()
+    if show_diagnostics:
+        render_diagnostics(profiler, diagnostics_panel, log_diagnostics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
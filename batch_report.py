@@ -0,0 +1,182 @@
+"""Headless batch reports: process a directory of Tally registers without Streamlit
+
+Usage:
+    python batch_report.py registers/ -o reports/ --workers 4
+
+Writes, for every register and for all registers combined:
+    stats.json   - summary statistics
+    data.parquet - processed rows
+    report.html  - self-contained report with the dashboard charts
+"""
+import argparse
+import glob
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from buyers import BuyerAliases
+from dashboard import Dashboard
+from data_processor import TallyDataProcessor, drop_duplicate_lines
+
+# Alias table of a batch run, kept with its reports
+ALIASES_FILE = 'buyer_aliases.json'
+
+# Register file types picked up from the input directory
+REGISTER_PATTERNS = ['*.xlsx', '*.xls', '*.xml']
+
+# Charts included in the HTML report, with the column each one needs
+REPORT_CHARTS = [
+    ('trend', 'date'),
+    ('state_pie', 'state'),
+    ('state_bar', 'state'),
+    ('buyer_bar', 'clean_buyer'),
+    ('product_treemap', 'item_name'),
+    ('product_trend', 'item_name'),
+]
+
+
+def _json_default(value):
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def render_html_report(title, dashboard):
+    """Self-contained HTML page with the KPI cards and dashboard charts"""
+    cards = ''.join(
+        f'<div class="card"><div class="label">{html.escape(c["label"])}</div>'
+        f'<div class="value">{html.escape(str(c["value"]))}</div>'
+        f'<div class="delta">{html.escape(c.get("delta", ""))}</div></div>'
+        for c in dashboard.kpis()
+    )
+
+    charts = []
+    for name, column in REPORT_CHARTS:
+        if column not in dashboard.columns:
+            continue
+        if name.startswith('product') and dashboard.product_sales().empty:
+            continue
+        # Inline plotly.js once so the file works offline
+        charts.append(dashboard.build_figure(name).to_html(full_html=False, include_plotlyjs=not charts))
+
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+.cards {{ display: flex; gap: 1em; margin-bottom: 2em; }}
+.card {{ flex: 1; padding: 1em; border: 1px solid #ddd; border-radius: 8px; }}
+.label {{ color: #666; }} .value {{ font-size: 1.6em; font-weight: bold; }} .delta {{ color: #2a7; }}
+</style></head>
+<body><h1>📊 {html.escape(title)}</h1>
+<div class="cards">{cards}</div>
+{''.join(charts)}
+</body></html>"""
+
+
+def write_outputs(directory, title, processor):
+    """Write stats.json, data.parquet and report.html for a processed register"""
+    os.makedirs(directory, exist_ok=True)
+    stats = processor.stats or processor.get_summary_stats()
+
+    with open(os.path.join(directory, 'stats.json'), 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2, default=_json_default)
+    processor.df.to_parquet(os.path.join(directory, 'data.parquet'), index=False)
+
+    dashboard = Dashboard(processor.df, stats, processor.cube)
+    with open(os.path.join(directory, 'report.html'), 'w', encoding='utf-8') as f:
+        f.write(render_html_report(title, dashboard))
+
+
+def process_register(path, output_dir, chunk_size=None, aliases=None):
+    """Process one register and write its outputs (runs inside a worker process)
+
+    Buyer names resolve through an in-memory copy of the alias entries;
+    new spellings are merged by the parent across all registers. Returns
+    (name, df, report, error); a register that fails to process or write
+    comes back with df None and the error message, so the rest still run.
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    processor = TallyDataProcessor(path, chunk_size=chunk_size, aliases=BuyerAliases(aliases))
+    try:
+        df = processor.load_and_process()
+        if df is None or df.empty:
+            return name, None, processor.report, None
+
+        processor.get_summary_stats()
+        write_outputs(os.path.join(output_dir, name), f"CMPL Sales Report - {name}", processor)
+    except Exception as e:
+        return name, None, processor.report, str(e)
+    return name, df, processor.report, None
+
+
+def run(input_dir, output_dir, workers=None, chunk_size=None):
+    """Process every register in input_dir; returns the consolidated stats"""
+    paths = sorted({p for pattern in REGISTER_PATTERNS for p in glob.glob(os.path.join(input_dir, pattern))})
+    if not paths:
+        raise SystemExit(f"No registers found in {input_dir}")
+
+    # Seeded from the app's table but saved with the reports: reclustering here must not rewrite the live one
+    os.makedirs(output_dir, exist_ok=True)
+    aliases = BuyerAliases(path=os.path.join(output_dir, ALIASES_FILE))
+    aliases.merge(BuyerAliases.load().aliases)
+
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            process_register, paths, [output_dir] * len(paths), [chunk_size] * len(paths), [aliases.aliases] * len(paths)
+        ))
+
+    failed = []
+    for (name, df, _, error), path in zip(results, paths):
+        if error:
+            failed.append(os.path.basename(path))
+            status = f"FAILED - {error}"
+        else:
+            status = f"{len(df)} rows" if df is not None else "no valid data"
+        print(f"  {os.path.basename(path)}: {status}")
+
+    # Consolidated view across the registers that processed, duplicates across files removed
+    df, duplicates = drop_duplicate_lines([df for _, df, _, _ in results])
+    if df.empty:
+        raise SystemExit("No valid data found in any register")
+
+    processor = TallyDataProcessor.from_processed(df, {}, aliases=aliases)
+    # Registers were canonicalized in separate processes; merge variants split between them
+    processor.df = processor.canonicalize_buyers(df, recluster=True)
+    processor.duplicates_removed = duplicates
+    for _, _, report, _ in results:
+        for key, count in report.items():
+            processor.report[key] = processor.report.get(key, 0) + count
+    stats = processor.get_summary_stats()
+    stats['failed_registers'] = failed
+    write_outputs(os.path.join(output_dir, '_consolidated'), "CMPL Sales Report - All Registers", processor)
+
+    print(f"Processed {len(paths) - len(failed)} of {len(paths)} registers ({len(df)} rows) in {time.time() - started:.1f}s -> {output_dir}")
+    if failed:
+        print(f"Failed: {', '.join(failed)}", file=sys.stderr)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate sales reports for a directory of Tally registers")
+    parser.add_argument('input_dir', help="Directory containing Tally GST Sales Register exports")
+    parser.add_argument('-o', '--output', default='reports', help="Output directory (default: reports)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=None, help="Stream each register in row chunks of this size")
+    args = parser.parse_args(argv)
+
+    stats = run(args.input_dir, args.output, workers=args.workers, chunk_size=args.chunk_size)
+    return 1 if stats['failed_registers'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Synthetic Tally GST Sales Register generator
+
+Produces workbooks with the hierarchical layout load_and_process expects:
+a voucher header row (date, buyer, state, ₹-formatted total) followed by
+item rows whose particulars match the product keywords and whose date,
+state and voucher cells are left blank for forward filling.
+
+Usage:
+    python benchmarks/generate_register.py 100000 -o bench_data/register_100k.xlsx
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+from openpyxl import Workbook
+
+# Excel's sheet limit (minus the header); larger registers are split into parts
+MAX_SHEET_ROWS = 1048575
+
+HEADER = ['Date', 'Particulars', 'Vch No.', 'State', 'Value']
+
+STATES = [
+    'Maharashtra', 'Gujarat', 'Karnataka', 'Tamil Nadu', 'Telangana', 'Rajasthan',
+    'Uttar Pradesh', 'West Bengal', 'Madhya Pradesh', 'Punjab', 'Kerala', 'Haryana'
+]
+
+PRODUCTS = [
+    'Hydraulic Pump HP-{}', 'Hydraulic Cylinder HC-{}', 'Broomer BR-{}',
+    'Road Broomer Assembly RB-{}', 'CFGH-{} Coupling', 'Gearbox GB-{}', 'Gearbox Assembly GA-{}'
+]
+
+BUYER_SUFFIXES = ['Pvt Ltd', 'Pvt. Ltd.', 'PRIVATE LIMITED', 'Enterprises', 'Traders', '& Sons', 'Industries']
+
+
+def _buyers(rng, count):
+    names = ['Shree', 'Sai', 'Ganesh', 'Balaji', 'Om', 'Laxmi', 'Krishna', 'Durga', 'Metro', 'National']
+    trades = ['Engineering', 'Infra', 'Constructions', 'Municipal Works', 'Equipments', 'Projects']
+    return [
+        f"{'M/s ' if rng.random() < 0.2 else ''}{rng.choice(names)} {rng.choice(trades)} {rng.choice(BUYER_SUFFIXES)}"
+        for _ in range(count)
+    ]
+
+
+def iter_register_rows(rows, seed=42, start=date(2021, 4, 1), text_dates=False):
+    """Yield register rows (header excluded) until `rows` rows have been produced"""
+    rng = random.Random(seed)
+    buyers = _buyers(rng, max(20, rows // 500))
+    products = [p.format(rng.randint(10, 999)) for p in PRODUCTS for _ in range(8)]
+    # About 40 vouchers a day spreads the register over a realistic period
+    days = max(1, rows // 120)
+
+    produced = 0
+    voucher = 0
+    while produced < rows:
+        voucher += 1
+        day = start + timedelta(days=rng.randrange(days))
+        amounts = [round(rng.uniform(5000, 250000), 2) for _ in range(rng.randint(1, 4))]
+        total = sum(amounts)
+
+        cell_date = day.strftime('%d-%b-%Y') if text_dates else day
+        yield [cell_date, rng.choice(buyers), f"CMPL/{voucher:07d}", rng.choice(STATES), f"₹{total:,.2f}"]
+        produced += 1
+
+        for amount in amounts:
+            if produced >= rows:
+                break
+            yield [None, rng.choice(products), None, None, amount]
+            produced += 1
+
+
+def generate(rows, output, seed=42, text_dates=False):
+    """Write a register of `rows` rows; returns the list of files written"""
+    base, ext = os.path.splitext(output)
+    parts = max(1, -(-rows // MAX_SHEET_ROWS))
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    written = []
+    row_iter = iter_register_rows(rows, seed=seed, text_dates=text_dates)
+    for part in range(parts):
+        path = output if parts == 1 else f"{base}_part{part + 1}{ext}"
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('GST Sales Register')
+        ws.append(HEADER)
+        for _, row in zip(range(MAX_SHEET_ROWS), row_iter):
+            ws.append(row)
+        wb.save(path)
+        written.append(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Tally GST Sales Register")
+    parser.add_argument('rows', type=int, help="Number of register rows (1k to 5M)")
+    parser.add_argument('-o', '--output', default='bench_data/register.xlsx', help="Output .xlsx path")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--text-dates', action='store_true', help="Write dates as dd-Mon-yyyy text like some Tally exports")
+    args = parser.parse_args(argv)
+
+    for path in generate(args.rows, args.output, seed=args.seed, text_dates=args.text_dates):
+        print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
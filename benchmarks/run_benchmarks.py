@@ -0,0 +1,167 @@
+"""Benchmark harness for the processing pipeline and dashboard aggregations
+
+Generates (or reuses) synthetic registers of the requested sizes, then times
+and memory-profiles every stage of load_and_process, the summary stats and
+each dashboard aggregation and figure. Results are written as JSON so runs
+can be compared across versions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 -o bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch_report import REPORT_CHARTS  # noqa: E402
+from benchmarks.generate_register import generate  # noqa: E402
+from dashboard import Dashboard  # noqa: E402
+from data_processor import PROCESSOR_VERSION, TallyDataProcessor  # noqa: E402
+from exports import EXPORT_FORMATS, default_columns, export_buffer  # noqa: E402
+from table_index import TableIndex  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Dashboard aggregations behind the render_* tabs
+AGGREGATIONS = ['trend', 'state_sales', 'buyer_stats', 'product_sales', 'product_trend']
+
+
+def measure(fn, memory=False):
+    """Run fn once; returns (result, seconds, peak bytes allocated or None)"""
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def profile_pipeline(paths, memory=False):
+    """Run every stage on the given register parts; returns a list of stage records"""
+    records = []
+
+    def stage(name, fn):
+        result, seconds, peak = measure(fn, memory)
+        rows = len(result) if isinstance(result, (pd.DataFrame, pd.Series)) else None
+        records.append({'stage': name, 'seconds': round(seconds, 6), 'peak_bytes': peak, 'rows': rows})
+        return result
+
+    processor = TallyDataProcessor(paths[0])
+    carry = {}
+
+    df = stage('read', lambda: pd.concat([pd.read_excel(p) for p in paths], ignore_index=True))
+    df = stage('rename', lambda: processor._normalize_columns(df))
+    df = stage('date', lambda: processor._clean_dates(df, carry))
+    df = stage('fill', lambda: processor._fill_dimensions(df, carry))
+    df = stage('value', lambda: processor._clean_values(df))
+    df = stage('item_detection', lambda: processor._detect_items(df, carry))
+    df = stage('time_dimensions', lambda: processor._add_time_dimensions(df))
+    df = stage('compact', lambda: processor._compact(df))
+
+    processor.df = df
+    stats = stage('stats', processor.get_summary_stats)
+
+    dashboard = Dashboard(df, stats, processor.cube)
+    for name in AGGREGATIONS:
+        stage(f'dashboard.{name}', getattr(dashboard, name))
+    for name, column in REPORT_CHARTS:
+        if column in df.columns:
+            stage(f'figure.{name}', lambda: dashboard.build_figure(name))
+    index = stage('table_index', lambda: TableIndex(df))
+    selection = index.select({})
+    for fmt in EXPORT_FORMATS:
+        stage(f'export.{fmt}', lambda: export_buffer(index, selection, default_columns(df.columns), fmt))
+
+    return records
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(sizes, data_dir, memory=True, repeat=1):
+    """Benchmark each size; returns the JSON-ready results document"""
+    results = []
+    for rows in sizes:
+        path = os.path.join(data_dir, f'register_{rows}.xlsx')
+        parts = sorted(
+            os.path.join(data_dir, name) for name in os.listdir(data_dir)
+            if name == f'register_{rows}.xlsx' or name.startswith(f'register_{rows}_part')
+        ) if os.path.isdir(data_dir) else []
+        if not parts:
+            print(f"Generating {rows:,}-row register...")
+            parts = generate(rows, path)
+
+        timings = [profile_pipeline(parts) for _ in range(repeat)]
+        # Best of the repeats per stage; memory comes from a separate traced run
+        stages = []
+        for records in zip(*timings):
+            best = min(records, key=lambda r: r['seconds'])
+            stages.append(dict(best))
+        if memory:
+            for record, traced in zip(stages, profile_pipeline(parts, memory=True)):
+                record['peak_bytes'] = traced['peak_bytes']
+
+        total = sum(r['seconds'] for r in stages)
+        print(f"{rows:>10,} rows: {total:8.2f}s")
+        for r in stages:
+            mem = f"{r['peak_bytes'] / 1024 ** 2:9.1f} MB" if r['peak_bytes'] is not None else ''
+            print(f"    {r['stage']:<28} {r['seconds']:9.4f}s {mem}")
+
+        results.append({
+            'rows': rows,
+            'files': [os.path.basename(p) for p in parts],
+            'file_bytes': sum(os.path.getsize(p) for p in parts),
+            'total_seconds': round(total, 6),
+            'stages': stages
+        })
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'processor_version': PROCESSOR_VERSION,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tally processing pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Register sizes in rows")
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'bench_data'), help="Where generated registers are kept")
+    parser.add_argument('-o', '--output', default='bench_results.json', help="JSON results file")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed runs per size (best is kept)")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    document = run(args.sizes, args.data_dir, memory=not args.no_memory, repeat=args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
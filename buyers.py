@@ -0,0 +1,385 @@
+import os
+import re
+import json
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are serialized within the process only
+    fcntl = None
+
+# Alias table next to the app: buyer spelling -> canonical name
+ALIASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "buyer_aliases.json")
+
+# Spellings of legal forms folded to one token before comparing names
+TOKEN_SYNONYMS = {
+    'private': 'pvt',
+    'pvt': 'pvt',
+    'limited': 'ltd',
+    'ltd': 'ltd',
+    'company': 'co',
+    'corporation': 'corp',
+    'brothers': 'bros',
+    '&': 'and'
+}
+
+# Tokens that say nothing about which buyer it is, ignored for similarity
+LEGAL_TOKENS = {'pvt', 'ltd', 'co', 'corp', 'llp', 'inc', 'bros', 'and', 'the'}
+
+# Legal forms in order of precedence ("pvt ltd" is pvt); names with different forms never merge
+LEGAL_FORMS = ['llp', 'pvt', 'ltd', 'inc', 'corp']
+
+_HONORIFIC = re.compile(r'^\s*(m\s*/\s*s|messrs|m\.\s*s)\b\.?\s*', re.IGNORECASE)
+_TOKEN = re.compile(r'[a-z0-9]+|&')
+
+# Minimum Dice similarity of character trigrams for two names to be merged
+SIMILARITY_THRESHOLD = 0.85
+NGRAM = 3
+
+# Trigrams shared by more names than this are too common to suggest a match
+MAX_POSTING = 200
+
+_save_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on a side file, so saves from other processes take turns"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_current = {}
+_current_lock = threading.Lock()
+
+
+def current_aliases(path=ALIASES_PATH):
+    """The alias table as last saved, re-read only when the file changes; shared, so never extend it"""
+    try:
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        version = None
+    with _current_lock:
+        cached = _current.get(path)
+        if cached is None or cached[0] != version:
+            cached = _current[path] = (version, BuyerAliases.load(path))
+        return cached[1]
+
+
+def _fold(token):
+    token = TOKEN_SYNONYMS.get(token, token)
+    # Plurals: "Traders" and "Trader" are the same buyer
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        token = token[:-1]
+    return token
+
+
+def normalize_name(name):
+    """Lower-cased tokens with honorifics dropped and legal forms folded ("M/s ABC Pvt. Ltd." -> "abc pvt ltd")"""
+    text = _HONORIFIC.sub('', str(name)).lower()
+    return ' '.join(_fold(t) for t in _TOKEN.findall(text))
+
+
+def _ngrams(text):
+    padded = f' {text} '
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+def _legal_form(tokens):
+    return next((form for form in LEGAL_FORMS if form in tokens), None)
+
+
+def _signature(key):
+    """(trigrams, numbers, legal form) of a normalized name, as compared by _similar"""
+    tokens = key.split()
+    core = ' '.join(t for t in tokens if t not in LEGAL_TOKENS) or key
+    # Numbers (branch, unit, plot) must agree exactly
+    numbers = tuple(t for t in core.split() if t.isdigit())
+    return _ngrams(core), numbers, _legal_form(tokens)
+
+
+def _similar(a, b):
+    """Whether two signatures are the same buyer: equal numbers, compatible legal forms, close trigrams"""
+    if a[1] != b[1]:
+        return False
+    # "Metro LLP" and "Metro Pvt Ltd" may be different entities; a missing form is just a short spelling
+    if a[2] and b[2] and a[2] != b[2]:
+        return False
+    return 2 * len(a[0] & b[0]) / (len(a[0]) + len(b[0])) >= SIMILARITY_THRESHOLD
+
+
+def _candidates(grams, index):
+    """Entries sharing at least two trigrams with grams, through an inverted index"""
+    counts = Counter()
+    for gram in grams:
+        posting = index.get(gram, ())
+        if len(posting) <= MAX_POSTING:
+            counts.update(posting)
+    # The index may undercount shared grams, so callers confirm on the full sets
+    return [j for j, shared in counts.items() if shared >= 2]
+
+
+def cluster_names(names):
+    """Cluster id per name: identical normalized names first, then trigram near-duplicates
+
+    Names are blocked on their normalized tokens, so spelling variants of
+    legal forms collapse by hashing. The distinct blocks are compared only
+    with candidates found through a trigram inverted index, which keeps the
+    work close to linear in the number of names.
+    """
+    block_ids = {}
+    blocks = [block_ids.setdefault(normalize_name(n), len(block_ids)) for n in names]
+    signatures = [_signature(key) for key in block_ids]
+
+    parent = list(range(len(signatures)))
+    # Legal form of each cluster, so chains through a name without one cannot join two forms
+    forms = [signature[2] for signature in signatures]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = defaultdict(list)
+    for i, signature in enumerate(signatures):
+        for gram in signature[0]:
+            index[gram].append(i)
+
+    for i, signature in enumerate(signatures):
+        for j in _candidates(signature[0], index):
+            if j > i and _similar(signature, signatures[j]):
+                root_i, root_j = find(i), find(j)
+                if root_i == root_j or (forms[root_i] and forms[root_j] and forms[root_i] != forms[root_j]):
+                    continue
+                root, child = min(root_i, root_j), max(root_i, root_j)
+                parent[child] = root
+                forms[root] = forms[root] or forms[child]
+
+    return [find(b) for b in blocks]
+
+
+class _CanonicalIndex:
+    """Trigram index over canonical names, queried with new spellings only"""
+
+    def __init__(self, names=()):
+        self.names = []
+        self.signatures = []
+        self.by_key = {}
+        self.postings = defaultdict(list)
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        key = normalize_name(name)
+        if key in self.by_key:
+            return
+        position = len(self.names)
+        self.by_key[key] = name
+        self.names.append(name)
+        self.signatures.append(_signature(key))
+        for gram in self.signatures[-1][0]:
+            self.postings[gram].append(position)
+
+    def match(self, name, form=None):
+        """Canonical name a spelling belongs to, or None; form is the legal form of the spelling's cluster"""
+        key = normalize_name(name)
+        if key in self.by_key:
+            return self.by_key[key]
+        grams, numbers, own_form = _signature(key)
+        signature = (grams, numbers, own_form or form)
+        best, best_score = None, 0.0
+        for j in _candidates(signature[0], self.postings):
+            other = self.signatures[j]
+            if _similar(signature, other):
+                score = len(signature[0] & other[0]) / (len(signature[0]) + len(other[0]))
+                if score > best_score:
+                    best, best_score = self.names[j], score
+        return best
+
+
+class BuyerAliases:
+    """Persisted alias table resolving buyer-name spellings to one canonical name
+
+    Known spellings resolve with a dictionary lookup. New spellings are
+    clustered among themselves and looked up in a trigram index of the
+    canonical names, and the table is extended. Existing entries are never changed unless
+    reclustering is asked for, so a wrong merge can be fixed by editing
+    the JSON file (e.g. mapping a spelling to itself).
+    """
+
+    def __init__(self, aliases=None, path=None):
+        self.aliases = dict(aliases or {})
+        self.path = path
+        self.changed = False
+        # Entries set since the last save; only these are written over the file
+        self._updates = {}
+        # Trigram index of the canonical names, built on the first unknown spelling
+        self._index = None
+
+    @classmethod
+    def load(cls, path=ALIASES_PATH):
+        """Alias table from disk (empty when missing or unreadable)"""
+        aliases = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    aliases = json.load(f)
+            except (OSError, ValueError):
+                aliases = {}
+        return cls(aliases, path)
+
+    def save(self, path=None):
+        """Merge the new entries into the file and write it atomically
+
+        The file is re-read under the lock, so spellings other sessions or
+        processes saved since this table was loaded (and hand edits) are
+        kept rather than overwritten.
+        """
+        path = path or self.path
+        if not path:
+            return
+        with _save_lock, _file_lock(path):
+            aliases = type(self).load(path).aliases
+            aliases.update(self._updates)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(aliases, f, indent=1, sort_keys=True, ensure_ascii=False)
+            os.replace(tmp, path)
+        self.aliases = aliases
+        self._updates = {}
+        self._index = None
+        self.changed = False
+
+    def merge(self, aliases):
+        """Take over another table's entries (e.g. to seed a new table); the next save writes them"""
+        for alias, canonical in aliases.items():
+            self._set(alias, canonical)
+        self._index = None
+
+    def _set(self, alias, canonical):
+        if self.aliases.get(alias) != canonical:
+            self.aliases[alias] = canonical
+            self._updates[alias] = canonical
+            self.changed = True
+
+    def resolve(self, series):
+        """Buyer categorical re-resolved by lookup only, or None when no name changes
+
+        For results processed earlier: a hand edit may since have mapped one
+        of their canonical names to another. Unknown names are kept.
+        """
+        names = series.cat.categories
+        resolved = [self.aliases.get(n, n) for n in names]
+        if all(r == n for r, n in zip(resolved, names)):
+            return None
+        new_codes, uniques = pd.factorize(np.array(resolved, dtype=object))
+        codes = series.cat.codes.to_numpy()
+        row_codes = np.where(codes >= 0, new_codes[np.maximum(codes, 0)], -1)
+        return pd.Series(
+            pd.Categorical.from_codes(row_codes, categories=uniques),
+            index=series.index,
+            name=series.name
+        )
+
+    def canonicalize(self, series, recluster=False):
+        """Categorical of canonical buyer names for a buyer column
+
+        Works on the distinct names only. recluster=True also re-clusters
+        canonical names that are all known (e.g. after registers were
+        canonicalized independently).
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, names = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, names = pd.factorize(series)
+        names = [str(n) for n in names]
+        counts = np.bincount(codes[codes >= 0], minlength=len(names))
+
+        resolved = [self.aliases.get(n) for n in names]
+        if recluster:
+            self._recluster(names, resolved, counts)
+        elif any(r is None for r in resolved):
+            self._extend(names, resolved, counts)
+        resolved = [self.aliases.get(n, r) for n, r in zip(names, resolved)]
+
+        new_codes, uniques = pd.factorize(np.array(resolved, dtype=object))
+        row_codes = np.where(codes >= 0, new_codes[np.maximum(codes, 0)] if len(new_codes) else -1, -1)
+        return pd.Series(
+            pd.Categorical.from_codes(row_codes, categories=uniques),
+            index=series.index,
+            name=series.name
+        )
+
+    def _canonical_index(self):
+        if self._index is None:
+            self._index = _CanonicalIndex(sorted(set(self.aliases.values())))
+        return self._index
+
+    def _extend(self, names, resolved, counts):
+        """Resolve unknown spellings through the canonical index and record the aliases
+
+        Only the new spellings are clustered, among themselves, and looked
+        up in the index, so the cost follows the new names rather than the
+        size of the table.
+        """
+        unknown = [(name, int(count)) for name, canonical, count in zip(names, resolved, counts) if canonical is None]
+        clusters = defaultdict(list)
+        for member, cluster in zip(unknown, cluster_names([name for name, _ in unknown])):
+            clusters[cluster].append(member)
+
+        index = self._canonical_index()
+        for members in clusters.values():
+            form = next((f for f in (_legal_form(normalize_name(name).split()) for name, _ in members) if f), None)
+            # An existing canonical name wins; otherwise the most used spelling becomes one
+            canonical = next((c for c in (index.match(name, form) for name, _ in members) if c is not None), None)
+            if canonical is None:
+                canonical = max(members, key=lambda m: m[1])[0]
+                index.add(canonical)
+                self._set(canonical, canonical)
+            for name, _ in members:
+                self._set(name, canonical)
+
+    def _recluster(self, names, resolved, counts):
+        """Cluster every canonical name together with the spellings and record the aliases"""
+        # Each known spelling stands in for its canonical name
+        canonical_values = set(self.aliases.values())
+        weight = Counter(dict.fromkeys(canonical_values, 0))
+        for name, canonical, count in zip(names, resolved, counts):
+            weight[canonical or name] += int(count)
+        pool = list(weight)
+        clusters = cluster_names(pool)
+
+        # Existing canonical names are preferred; otherwise the most used spelling wins
+        best = {}
+        for position, (spelling, cluster) in enumerate(zip(pool, clusters)):
+            rank = (spelling in canonical_values, weight[spelling], -position)
+            if cluster not in best or rank > best[cluster][0]:
+                best[cluster] = (rank, spelling)
+        target = {spelling: best[cluster][1] for spelling, cluster in zip(pool, clusters)}
+
+        # A canonical merged into another cluster now points at the new canonical
+        merged = {s: t for s, t in target.items() if s != t and s in canonical_values}
+        if merged:
+            for alias, canonical in list(self.aliases.items()):
+                if canonical in merged:
+                    self._set(alias, merged[canonical])
+
+        for name, canonical in zip(names, resolved):
+            self._set(name, target[canonical or name])
+        for spelling, new in target.items():
+            self._set(spelling, new)
+        self._index = None
@@ -0,0 +1,144 @@
+import os
+import pickle
+import hashlib
+
+import pandas as pd
+
+from data_processor import PROCESSOR_VERSION
+from registry import DatasetRegistry
+from rollup import RollupCube, summarize
+
+# Default cache location and limits
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "registers")
+MAX_DISK_BYTES = 2 * 1024 ** 3
+
+
+class ProcessedCache:
+    """Content-addressed cache of processed registers (shared memory registry + Parquet on disk)"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_disk_bytes=MAX_DISK_BYTES, registry=None):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.registry = registry if registry is not None else DatasetRegistry()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*blobs):
+        """Hash the uploaded bytes together with the processor version"""
+        return ProcessedCache.key_from_digests(*(hashlib.sha256(blob).digest() for blob in blobs))
+
+    @staticmethod
+    def key_from_digests(*digests):
+        """make_key for blobs whose SHA-256 digests are already known"""
+        h = hashlib.sha256(f"tally-processor-v{PROCESSOR_VERSION}".encode())
+        for digest in digests:
+            h.update(digest)
+        return h.hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".parquet", base + ".stats.pkl"
+
+    def get(self, key):
+        """Return a DatasetHandle for a key, or None on a miss"""
+        handle = self.registry.acquire(key)
+        if handle is not None:
+            return handle
+
+        data_path, stats_path = self._paths(key)
+        if not (os.path.exists(data_path) and os.path.exists(stats_path)):
+            return None
+
+        try:
+            df = pd.read_parquet(data_path)
+            with open(stats_path, "rb") as f:
+                stats = pickle.load(f)
+        except Exception:
+            # Corrupt or partially written entry - drop it and reprocess
+            self._remove(key)
+            return None
+
+        # Touch files so disk eviction is least-recently-used
+        for path in (data_path, stats_path):
+            os.utime(path, None)
+
+        return self.registry.register(key, df, stats, RollupCube.from_frame(df))
+
+    def resolve_buyers(self, handle, aliases):
+        """Handle with buyer names resolved through the current alias table
+
+        Keys cover the uploads, catalog and processor version only, so
+        learning new spellings never invalidates them. A hand edit that
+        remaps a canonical buyer is applied here on the distinct names; the
+        renamed copy is shared under a key of its own.
+        """
+        df = handle.df
+        if df is None or 'clean_buyer' not in df.columns or not isinstance(df['clean_buyer'].dtype, pd.CategoricalDtype):
+            return handle
+        buyers = aliases.resolve(df['clean_buyer'])
+        if buyers is None:
+            return handle
+
+        key = self.make_key(handle.key.encode(), pickle.dumps(buyers.cat.categories.tolist()))
+        renamed = self.registry.acquire(key)
+        if renamed is not None:
+            return renamed
+        df = df.copy(deep=False)
+        df['clean_buyer'] = buyers
+        cube = RollupCube.from_frame(df)
+        stats = {**handle.stats, **summarize(cube), 'memory_bytes': int(df.memory_usage(deep=True).sum())}
+        return self.registry.register(key, df, stats, cube)
+
+    def put(self, key, df, stats, cube=None):
+        """Store a processed register and return a handle on the shared copy
+
+        Disk failures only skip persistence.
+        """
+        handle = self.register(key, df, stats, cube)
+        self.persist(key, df, stats)
+        return handle
+
+    def register(self, key, df, stats, cube=None):
+        """Share a processed register in memory only; persist() writes it to disk later"""
+        return self.registry.register(key, df, stats, cube if cube is not None else RollupCube.from_frame(df))
+
+    def persist(self, key, df, stats):
+        """Write a processed register to the disk cache (failures only skip persistence)"""
+        data_path, stats_path = self._paths(key)
+        try:
+            df.to_parquet(data_path + ".tmp", index=False)
+            with open(stats_path + ".tmp", "wb") as f:
+                pickle.dump(stats, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(data_path + ".tmp", data_path)
+            os.replace(stats_path + ".tmp", stats_path)
+        except Exception:
+            for path in (data_path + ".tmp", stats_path + ".tmp"):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+
+        self._evict()
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _evict(self):
+        """Drop least-recently-used entries until the disk budget is met"""
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            key = name.split(".", 1)[0]
+            path = os.path.join(self.cache_dir, name)
+            size, mtime = entries.get(key, (0, 0))
+            stat = os.stat(path)
+            entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda x: x[1][1]):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(key)
+            total -= size
@@ -0,0 +1,136 @@
+import os
+import hashlib
+import json
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Optional catalog file next to the app; the built-in keywords are used without it
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "products.yaml")
+
+# Built-in detection rules (raw particulars are kept as the item name)
+DEFAULT_PRODUCTS = [
+    {'keywords': ['Hydraulic']},
+    {'keywords': ['Broomer']},
+    {'keywords': ['CFGH']},
+    {'keywords': ['Gearbox']},
+]
+
+
+class _Automaton:
+    """Aho-Corasick automaton over lower-cased patterns"""
+
+    def __init__(self, patterns):
+        # patterns: list of (text, product index, anchored to start)
+        self.patterns = patterns
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for pid, (text, _, _) in enumerate(patterns):
+            state = 0
+            for ch in text:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(pid)
+
+        # Breadth-first pass to wire failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def best_match(self, text):
+        """Lowest product index matched anywhere in text (-1 if none)"""
+        best = -1
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for pid in self.out[state]:
+                pattern, product, anchored = self.patterns[pid]
+                if anchored and pos + 1 != len(pattern):
+                    continue
+                if best < 0 or product < best:
+                    best = product
+                    if best == 0:
+                        return 0
+        return best
+
+
+class ProductCatalog:
+    """Product detection rules: keywords, code prefixes and a canonical name"""
+
+    def __init__(self, products=None):
+        self.products = [
+            {
+                'name': p.get('name'),
+                'keywords': [str(k) for k in p.get('keywords', [])],
+                'prefixes': [str(k) for k in p.get('prefixes', [])]
+            }
+            for p in (DEFAULT_PRODUCTS if products is None else products)
+        ]
+        patterns = []
+        for i, p in enumerate(self.products):
+            patterns += [(k.lower(), i, False) for k in p['keywords'] if k]
+            patterns += [(k.lower(), i, True) for k in p['prefixes'] if k]
+        self._automaton = _Automaton(patterns)
+
+    @classmethod
+    def from_yaml(cls, path):
+        """Load a catalog from a YAML file with a top-level 'products' list"""
+        import yaml
+
+        with open(path, encoding='utf-8') as f:
+            cfg = yaml.safe_load(f) or {}
+        return cls(cfg.get('products') or [])
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH):
+        """Catalog from products.yaml when present, otherwise the built-in rules"""
+        if path and os.path.exists(path):
+            return cls.from_yaml(path)
+        return cls()
+
+    def fingerprint(self):
+        """Stable hash of the rules, so cached results follow catalog edits"""
+        return hashlib.sha256(json.dumps(self.products, sort_keys=True).encode()).hexdigest()
+
+    def match(self, series):
+        """Return (is_item, item_name) arrays for a particulars column
+
+        Only the distinct particulars go through the automaton; row results
+        are broadcast back through the factorized codes.
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+
+        product = np.array(
+            [self._automaton.best_match(str(u).strip().lower()) for u in uniques],
+            dtype='int32'
+        )
+        names = np.array(
+            [self.products[p]['name'] or u if p >= 0 else 'Unknown' for u, p in zip(uniques, product)],
+            dtype=object
+        )
+
+        matched = product >= 0
+        is_item = np.where(codes >= 0, matched[codes] if len(matched) else False, False)
+        item_name = np.where(is_item, names[codes] if len(names) else 'Unknown', 'Unknown')
+        return is_item, item_name
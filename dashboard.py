@@ -2,80 +2,139 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import pandas as pd
+
+from exports import EXPORT_FORMATS, default_columns, export_buffer, export_columns, file_name
+from figures import FIGURE_CACHE, downsample
+from instrumentation import Profiler, instrumented
+from rollup import RollupCube
+from table_index import TableIndex
+from timebuckets import GRANULARITIES, GRANULARITY_LABELS
+
+# Page sizes offered by the data table
+PAGE_SIZES = [25, 100, 500, 1000]
 
 class Dashboard:
-    def __init__(self, df, stats):
-        """Initialize with dataframe and stats"""
+    def __init__(self, df, stats, cube=None, profiler=None):
+        """Initialize with dataframe, stats and an optional prebuilt rollup cube
+        
+        With a SalesStore as the cube, df may be None: aggregations and table
+        pages are then queried from the store file.
+        """
         self.df = df
         self.stats = stats
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.cube = cube if cube is not None else RollupCube.from_frame(df)
+        self.columns = list(df.columns) if df is not None else list(self.cube.columns)
     
-    def render_kpi_cards(self):
-        """Render KPI cards at top"""
-        st.markdown("## 📊 Key Performance Indicators")
-        c1, c2, c3, c4 = st.columns(4)
+    def table(self):
+        """Row source for the data table: the frame's index, or the store when rows are on disk"""
+        if self.df is None:
+            return self.cube
+        return TableIndex.for_frame(self.df)
+    
+    def kpis(self):
+        """KPI card contents as dicts of label, value and optional delta"""
+        cards = [
+            {
+                'label': "💰 Total Sales",
+                'value': f"₹{self.stats.get('total_sales', 0):,.0f}",
+                'delta': f"{self.stats.get('total_transactions', 0)} Transactions"
+            },
+            {
+                'label': "📊 Avg Transaction",
+                'value': f"₹{self.stats.get('avg_transaction', 0):,.0f}"
+            }
+        ]
         
-        with c1:
-            st.metric(
-                label="💰 Total Sales",
-                value=f"₹{self.stats.get('total_sales', 0):,.0f}",
-                delta=f"{self.stats.get('total_transactions', 0)} Transactions"
-            )
+        dr = self.stats.get('date_range', {})
+        if dr.get('start') and dr.get('end'):
+            months = (dr['end'] - dr['start']).days / 30.44
+            cards.append({
+                'label': "📅 Period",
+                'value': f"{months:.1f} Months",
+                'delta': f"{dr['start'].strftime('%b %Y')} - {dr['end'].strftime('%b %Y')}"
+            })
+        else:
+            cards.append({'label': "📅 Period", 'value': "N/A"})
         
-        with c2:
-            st.metric(
-                label="📊 Avg Transaction",
-                value=f"₹{self.stats.get('avg_transaction', 0):,.0f}"
-            )
+        state_sales = self.stats.get('state_wise_sales', {})
+        if state_sales:
+            top_state = max(state_sales.items(), key=lambda x: x[1])
+            cards.append({
+                'label': "🏆 Top State",
+                'value': top_state[0],
+                'delta': f"₹{top_state[1]:,.0f}"
+            })
+        else:
+            cards.append({'label': "🏆 Top State", 'value': "N/A"})
         
-        with c3:
-            dr = self.stats.get('date_range', {})
-            if dr.get('start') and dr.get('end'):
-                months = (dr['end'] - dr['start']).days / 30.44
-                st.metric(
-                    label="📅 Period",
-                    value=f"{months:.1f} Months",
-                    delta=f"{dr['start'].strftime('%b %Y')} - {dr['end'].strftime('%b %Y')}"
-                )
-            else:
-                st.metric(label="📅 Period", value="N/A")
+        return cards
+    
+    @instrumented('render_kpi_cards')
+    def render_kpi_cards(self):
+        """Render KPI cards at top"""
+        st.markdown("## 📊 Key Performance Indicators")
         
-        with c4:
-            state_sales = self.stats.get('state_wise_sales', {})
-            if state_sales:
-                top_state = max(state_sales.items(), key=lambda x: x[1])
-                st.metric(
-                    label="🏆 Top State",
-                    value=top_state[0],
-                    delta=f"₹{top_state[1]:,.0f}"
-                )
-            else:
-                st.metric(label="🏆 Top State", value="N/A")
+        for col, card in zip(st.columns(4), self.kpis()):
+            with col:
+                st.metric(**card)
         
         st.markdown("---")
     
-    def render_sales_trend(self):
-        """Sales trend over time"""
-        st.subheader("📈 Sales Trend Analysis")
-        
-        if 'date' not in self.df.columns or self.df['date'].isna().all():
-            st.warning("Date information not available")
-            return
-        
-        # Monthly aggregation
-        monthly = self.df.groupby(self.df['date'].dt.to_period('M')).agg({
-            'value': 'sum',
-            'date': 'count'
-        }).rename(columns={'date': 'transaction_count'})
-        monthly.index = monthly.index.to_timestamp()
+    def build_figure(self, name, **params):
+        """Build a named chart (e.g. 'trend', 'state_pie') without Streamlit"""
+        return getattr(self, f'build_{name}_figure')(**params)
+    
+    def chart(self, name, **params):
+        """Figure for a named chart, served from the figure cache when the data is unchanged"""
+        key = (self.cube.fingerprint(), name, tuple(sorted(params.items())))
+        return FIGURE_CACHE.get_or_build(key, lambda: self.build_figure(name, **params))
+    
+    # ---------- Aggregations (rolled up from the cube) ----------
+    def trend(self, granularity='month'):
+        """Sales value and transaction count per time bucket (indexed by bucket start)"""
+        trend = self.cube.rollup([granularity]).set_index(granularity).sort_index()
+        trend.index.name = 'date'
+        return trend.rename(columns={'count': 'transaction_count'})
+    
+    def state_sales(self):
+        """Sales per state, largest first"""
+        state_data = self.cube.rollup(['state'])[['state', 'value']].sort_values('value', ascending=False)
+        state_data.columns = ['State', 'Sales']
+        return state_data
+    
+    def buyer_stats(self):
+        """Total, count and average sale per buyer, largest first"""
+        buyer_stats = self.cube.rollup(['clean_buyer']).set_index('clean_buyer')
+        buyer_stats['mean'] = buyer_stats['value'] / buyer_stats['count']
+        buyer_stats = buyer_stats[['value', 'count', 'mean']].round(2)
+        buyer_stats.columns = ['Total_Sales', 'Transactions', 'Avg_Value']
+        return buyer_stats.sort_values('Total_Sales', ascending=False)
+    
+    def product_sales(self):
+        """Sales per detected product, largest first"""
+        prod_data = self.cube.rollup(['item_name'])
+        prod_data = prod_data[prod_data['item_name'] != 'Unknown']
+        return prod_data.set_index('item_name')['value'].sort_values(ascending=False)
+    
+    def product_trend(self, granularity='month'):
+        """Sales per detected product per time bucket"""
+        product_time = self.cube.rollup([granularity, 'item_name'])
+        product_time = product_time[product_time['item_name'] != 'Unknown']
+        return product_time.rename(columns={granularity: 'date'}).sort_values('date')
+    
+    # ---------- Figures ----------
+    def build_trend_figure(self, granularity='month'):
+        """Sales value line with transaction count bars on a secondary axis"""
+        trend = downsample(self.trend(granularity).reset_index(), 'date', 'value').set_index('date')
         
         # Create figure with secondary y-axis
         fig = make_subplots(specs=[[{"secondary_y": True}]])
         
         fig.add_trace(
             go.Scatter(
-                x=monthly.index,
-                y=monthly['value'],
+                x=trend.index,
+                y=trend['value'],
                 name='Sales Value',
                 line=dict(color='#1f77b4', width=3),
                 fill='tozeroy',
@@ -86,8 +145,8 @@ class Dashboard:
         
         fig.add_trace(
             go.Bar(
-                x=monthly.index,
-                y=monthly['transaction_count'],
+                x=trend.index,
+                y=trend['transaction_count'],
                 name='Transactions',
                 marker_color='rgba(255, 127, 14, 0.6)'
             ),
@@ -95,7 +154,7 @@ class Dashboard:
         )
         
         fig.update_layout(
-            title='Monthly Sales Trend',
+            title=f'{GRANULARITY_LABELS[granularity]} Sales Trend',
             hovermode='x unified',
             template='plotly_white',
             height=450,
@@ -104,77 +163,125 @@ class Dashboard:
         
         fig.update_yaxes(title_text="Sales Value (₹)", secondary_y=False)
         fig.update_yaxes(title_text="Number of Transactions", secondary_y=True)
+        return fig
+    
+    def build_state_pie_figure(self):
+        fig = px.pie(
+            self.state_sales(),
+            values='Sales',
+            names='State',
+            title='Sales by State',
+            hole=0.4,
+            color_discrete_sequence=px.colors.qualitative.Set3
+        )
+        fig.update_traces(textposition='inside', textinfo='percent+label')
+        return fig
+    
+    def build_state_bar_figure(self):
+        fig = px.bar(
+            self.state_sales().head(10),
+            y='State',
+            x='Sales',
+            orientation='h',
+            title='Top States by Sales',
+            color='Sales',
+            color_continuous_scale='Viridis'
+        )
+        fig.update_layout(yaxis=dict(autorange="reversed"))
+        return fig
+    
+    def build_buyer_bar_figure(self):
+        fig = px.bar(
+            self.buyer_stats().head(10).reset_index(),
+            y='clean_buyer',
+            x='Total_Sales',
+            orientation='h',
+            title='Top 10 Buyers',
+            color='Total_Sales',
+            color_continuous_scale='Blues'
+        )
+        fig.update_layout(yaxis=dict(autorange="reversed"), height=500)
+        return fig
+    
+    def build_product_treemap_figure(self):
+        fig = px.treemap(
+            self.product_sales().head(10).reset_index(),
+            path=['item_name'],
+            values='value',
+            title='Sales by Product',
+            color='value',
+            color_continuous_scale='RdBu'
+        )
+        return fig
+    
+    def build_product_trend_figure(self, granularity='month'):
+        fig = px.line(
+            downsample(self.product_trend(granularity), 'date', 'value', group='item_name'),
+            x='date',
+            y='value',
+            color='item_name',
+            title=f'{GRANULARITY_LABELS[granularity]} Product Trends',
+            markers=True
+        )
+        return fig
+    
+    # ---------- Tabs ----------
+    def granularity_selector(self, key):
+        """Time bucket picker shared by the trend charts (monthly by default)"""
+        return st.radio(
+            "Granularity",
+            GRANULARITIES,
+            index=GRANULARITIES.index('month'),
+            format_func=GRANULARITY_LABELS.get,
+            horizontal=True,
+            key=key
+        )
+    
+    @instrumented('render_sales_trend')
+    def render_sales_trend(self):
+        """Sales trend over time"""
+        st.subheader("📈 Sales Trend Analysis")
+        
+        if not self.cube.has('day'):
+            st.warning("Date information not available")
+            return
         
-        st.plotly_chart(fig, use_container_width=True)
+        granularity = self.granularity_selector('trend_granularity')
+        st.plotly_chart(self.chart('trend', granularity=granularity), use_container_width=True)
     
+    @instrumented('render_state_analysis')
     def render_state_analysis(self):
         """State-wise analysis"""
         st.subheader("🗺️ State-wise Sales Distribution")
         
-        if 'state' not in self.df.columns:
+        if 'state' not in self.columns:
             st.warning("State information not found")
             return
         
         col1, col2 = st.columns(2)
         
-        state_data = self.df.groupby('state')['value'].sum().sort_values(ascending=False).reset_index()
-        state_data.columns = ['State', 'Sales']
-        
         with col1:
-            fig = px.pie(
-                state_data,
-                values='Sales',
-                names='State',
-                title='Sales by State',
-                hole=0.4,
-                color_discrete_sequence=px.colors.qualitative.Set3
-            )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(self.chart('state_pie'), use_container_width=True)
         
         with col2:
-            fig = px.bar(
-                state_data.head(10),
-                y='State',
-                x='Sales',
-                orientation='h',
-                title='Top States by Sales',
-                color='Sales',
-                color_continuous_scale='Viridis'
-            )
-            fig.update_layout(yaxis=dict(autorange="reversed"))
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(self.chart('state_bar'), use_container_width=True)
     
+    @instrumented('render_buyer_analysis')
     def render_buyer_analysis(self):
         """Top buyers analysis"""
         st.subheader("🏢 Buyer Analytics")
         
-        if 'clean_buyer' not in self.df.columns:
+        if 'clean_buyer' not in self.columns:
             st.warning("Buyer information not found")
             return
         
         # Calculate buyer statistics
-        buyer_stats = self.df.groupby('clean_buyer').agg({
-            'value': ['sum', 'count', 'mean']
-        }).round(2)
-        buyer_stats.columns = ['Total_Sales', 'Transactions', 'Avg_Value']
-        buyer_stats = buyer_stats.sort_values('Total_Sales', ascending=False)
+        buyer_stats = self.buyer_stats()
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            top_10 = buyer_stats.head(10).reset_index()
-            fig = px.bar(
-                top_10,
-                y='clean_buyer',
-                x='Total_Sales',
-                orientation='h',
-                title='Top 10 Buyers',
-                color='Total_Sales',
-                color_continuous_scale='Blues'
-            )
-            fig.update_layout(yaxis=dict(autorange="reversed"), height=500)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(self.chart('buyer_bar'), use_container_width=True)
         
         with col2:
             st.markdown("### Buyer Details")
@@ -188,18 +295,16 @@ class Dashboard:
                 top_5_share = buyer_stats.head(5)['Total_Sales'].sum() / self.stats.get('total_sales', 1) * 100
                 st.metric("Top 5 Buyers Share", f"{top_5_share:.1f}%")
     
+    @instrumented('render_product_analysis')
     def render_product_analysis(self):
         """Product performance analysis"""
         st.subheader("🔧 Product Performance")
         
-        if 'item_name' not in self.df.columns:
+        if 'item_name' not in self.columns:
             st.warning("Product information not found")
             return
         
-        # Filter out unknown items
-        prod_df = self.df[self.df['item_name'] != 'Unknown']
-        
-        if prod_df.empty:
+        if self.product_sales().empty:
             st.info("No product data available")
             return
         
@@ -207,71 +312,67 @@ class Dashboard:
         
         with col1:
             # Product sales treemap
-            product_sales = prod_df.groupby('item_name')['value'].sum().sort_values(ascending=False).head(10)
-            fig = px.treemap(
-                product_sales.reset_index(),
-                path=['item_name'],
-                values='value',
-                title='Sales by Product',
-                color='value',
-                color_continuous_scale='RdBu'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(self.chart('product_treemap'), use_container_width=True)
         
         with col2:
             # Product trend
-            product_time = prod_df.groupby([
-                prod_df['date'].dt.to_period('M').astype(str),
-                'item_name'
-            ])['value'].sum().reset_index()
-            product_time['date'] = pd.to_datetime(product_time['date'])
-            
-            fig = px.line(
-                product_time,
-                x='date',
-                y='value',
-                color='item_name',
-                title='Product Trends',
-                markers=True
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            granularity = self.granularity_selector('product_granularity')
+            st.plotly_chart(self.chart('product_trend', granularity=granularity), use_container_width=True)
     
+    @instrumented('render_data_table')
     def render_data_table(self):
         """Raw data table with filters"""
         st.subheader("📋 Transaction Data")
         
         with st.expander("View & Filter Raw Data"):
+            index = self.table()
+            
             # Filters
             col1, col2 = st.columns(2)
+            filters = {}
             
             with col1:
-                if 'state' in self.df.columns:
-                    states = ['All'] + list(self.df['state'].unique())
-                    selected_state = st.selectbox("Filter by State", states)
+                if 'state' in self.columns:
+                    states = ['All'] + index.values('state')
+                    filters['state'] = st.selectbox("Filter by State", states)
             
             with col2:
-                if 'clean_buyer' in self.df.columns:
-                    buyers = ['All'] + list(self.df['clean_buyer'].unique())
-                    selected_buyer = st.selectbox("Filter by Buyer", buyers)
-            
-            # Apply filters
-            filtered_df = self.df.copy()
-            if 'state' in self.df.columns and selected_state != 'All':
-                filtered_df = filtered_df[filtered_df['state'] == selected_state]
-            if 'clean_buyer' in self.df.columns and selected_buyer != 'All':
-                filtered_df = filtered_df[filtered_df['clean_buyer'] == selected_buyer]
+                if 'clean_buyer' in self.columns:
+                    buyers = ['All'] + index.values('clean_buyer')
+                    filters['clean_buyer'] = st.selectbox("Filter by Buyer", buyers)
             
-            # Display
             display_cols = ['date', 'clean_buyer', 'state', 'item_name', 'value']
-            display_cols = [col for col in display_cols if col in filtered_df.columns]
+            display_cols = [col for col in display_cols if col in self.columns]
             
-            st.dataframe(filtered_df[display_cols], use_container_width=True, height=400)
+            # Sorting and pagination happen server side; only one page is sent
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                sort_by = st.selectbox("Sort by", display_cols)
+            with col2:
+                ascending = st.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Ascending"
+            with col3:
+                page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
+            
+            # Filters, sorting and paging run as an index lookup (or a store query)
+            selection = index.select(filters, sort_by, ascending)
+            total = index.count(selection)
+            pages = max(1, -(-total // page_size))
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+            
+            st.dataframe(index.page(selection, page, page_size, display_cols), use_container_width=True, height=400)
+            first = (page - 1) * page_size + 1 if total else 0
+            st.caption(f"Showing rows {first:,}–{min(page * page_size, total):,} of {total:,}")
+            
+            # Downloads of the filtered, sorted rows (the file is only built when asked for)
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                fmt = st.selectbox("Download format", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0])
+            with col2:
+                available = export_columns(self.columns)
+                columns = st.multiselect("Columns to download", available, default=default_columns(available))
             
-            # Download button
-            csv = filtered_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                "📥 Download Filtered CSV",
-                csv,
-                "tally_sales_data.csv",
-                "text/csv"
-            )
\ No newline at end of file
+            if st.button("📦 Prepare Download", disabled=not columns):
+                label, _, mime = EXPORT_FORMATS[fmt]
+                with self.profiler.stage(f'export.{fmt}', total):
+                    data = export_buffer(index, selection, columns, fmt)
+                st.download_button(f"📥 Download {label} ({len(data.getbuffer()) / 1024 ** 2:.1f} MB)", data, file_name(fmt), mime)
\ No newline at end of file
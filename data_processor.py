@@ -1,103 +1,564 @@
+import contextlib
+import mmap
+import os
+import pickle
 import pandas as pd
 import numpy as np
+import openpyxl
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from openpyxl.utils.exceptions import InvalidFileException
+
+from buyers import BuyerAliases
+from catalog import ProductCatalog
+from instrumentation import Profiler
+from parsers import parse_dates, parse_values
+from rollup import CUBE_DIMENSIONS, RollupCube, summarize
+from store import STORE_FILE, SalesStore
+from tally_xml import iter_voucher_frames
+
+# Bump whenever the processing output changes so cached registers are rebuilt
+PROCESSOR_VERSION = 8
+
+# Rows per chunk for streaming ingest
+DEFAULT_CHUNK_SIZE = 50000
+
+# Map Tally column names
+COLUMN_MAPPING = {
+    'particulars': 'buyer_name',
+    'buyer': 'buyer_name',
+    'buyer_name': 'buyer_name',
+    'value': 'value',
+    'amount': 'value',
+    'date': 'date',
+    'state': 'state',
+    'vch_no.': 'voucher_no',
+    'vch._no.': 'voucher_no',
+    'voucher_no.': 'voucher_no',
+    'voucher_no': 'voucher_no',
+    'voucher_number': 'voucher_no'
+}
+
+# Columns identifying a sales line when de-duplicating across files
+DUPLICATE_KEY_COLUMNS = ['voucher_no', 'date', 'clean_buyer', 'item_name', 'value']
+
+# Low-cardinality text dimensions stored as categoricals
+CATEGORICAL_COLUMNS = ['buyer_name', 'clean_buyer', 'state', 'item_name', 'voucher_no']
+
+# Leading bytes identifying each register format
+FORMAT_SIGNATURES = [
+    (b'PK\x03\x04', 'xlsx'),
+    (b'\xd0\xcf\x11\xe0', 'xls'),
+    (b'\xff\xfe', 'xml'),
+    (b'\xfe\xff', 'xml'),
+    (b'<', 'xml')
+]
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+
+
+def concat_frames(frames):
+    """Concatenate processed frames, unioning categorical dictionaries"""
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    
+    frames = [f.copy(deep=False) for f in frames]
+    for col in frames[0].columns:
+        dtype = frames[0][col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered:
+            categories = pd.api.types.union_categoricals(
+                [f[col] for f in frames if col in f.columns], ignore_order=True
+            ).categories
+            for f in frames:
+                if col in f.columns:
+                    f[col] = f[col].cat.set_categories(categories)
+    
+    return pd.concat(frames, ignore_index=True)
+
+
+def voucher_text(series):
+    """Voucher numbers as a categorical of text, whether a register stores them as text or as numbers"""
+    codes, uniques = pd.factorize(series)
+    labels = [str(int(u)) if isinstance(u, float) and u.is_integer() else str(u) for u in uniques]
+    # Registers of both kinds must share one text dictionary when concatenated
+    categories, new_codes = np.unique(np.array(labels, dtype=object), return_inverse=True)
+    row_codes = np.where(codes >= 0, new_codes[np.maximum(codes, 0)] if len(new_codes) else -1, -1)
+    return pd.Series(pd.Categorical.from_codes(row_codes, categories=categories), index=series.index, name=series.name)
+
+
+def sniff_format(source):
+    """Register format of a path or buffer from its first bytes: 'xlsx', 'xls', 'xml' or None"""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            head = f.read(64)
+    else:
+        position = source.tell()
+        head = source.read(64)
+        source.seek(position)
+    # XML exports may start with a UTF-8 byte-order mark or blank lines
+    head = head.removeprefix(b'\xef\xbb\xbf').lstrip()
+    return next((fmt for signature, fmt in FORMAT_SIGNATURES if head.startswith(signature)), None)
+
+
+class _MappedFile(mmap.mmap):
+    """Read-only memory map usable wherever a seekable binary file is expected"""
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+
+
+@contextlib.contextmanager
+def open_register(source):
+    """Binary file object for a register: buffers are rewound and read in place, paths memory-mapped"""
+    if not isinstance(source, str):
+        source.seek(0)
+        yield source
+        return
+    
+    with open(source, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped
+            yield f
+            return
+        with _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _bound(pick, *dates):
+    """min/max over the dates that are known"""
+    dates = [d for d in dates if d is not None and not pd.isna(d)]
+    return pick(dates) if dates else None
+
+
+def _load_single(file_path, chunk_size, catalog, profile=False):
+    """Process one register (runs inside a worker process); returns (df, ingest report, stage records)"""
+    processor = TallyDataProcessor(file_path, chunk_size=chunk_size, catalog=catalog, profiler=Profiler(enabled=profile))
+    # Buyer names are canonicalized once, by the parent, across all files
+    return processor.load_and_process(canonicalize=False), processor.report, processor.profiler.records
+
+
+def drop_duplicate_lines(frames):
+    """Concatenate per-file frames, dropping lines already seen in an earlier file
+
+    Repeats inside a single file are kept: the n-th occurrence of a line is only
+    removed when another file already contributed an n-th occurrence.
+    """
+    frames = [f for f in frames if f is not None and not f.empty]
+    keys = []
+    for f in frames:
+        cols = [c for c in DUPLICATE_KEY_COLUMNS if c in f.columns]
+        line_hash = pd.util.hash_pandas_object(f[cols], index=False).to_numpy()
+        occurrence = pd.Series(line_hash).groupby(line_hash, sort=False).cumcount().to_numpy()
+        keys.append(pd.DataFrame({'line': line_hash, 'occurrence': occurrence}))
+    
+    df = concat_frames(frames)
+    if df.empty:
+        return df, 0
+    
+    duplicated = pd.concat(keys, ignore_index=True).duplicated().to_numpy()
+    return df[~duplicated].reset_index(drop=True), int(duplicated.sum())
+
 
 class TallyDataProcessor:
-    def __init__(self, file_path):
+    def __init__(self, file_path, chunk_size=None, max_workers=None, catalog=None, profiler=None, aliases=None):
+        """file_path may be a register (path or in-memory binary buffer) or a list of registers"""
         self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.catalog = catalog if catalog is not None else ProductCatalog.load()
+        self._aliases = aliases
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.max_workers = max_workers
+        # Data rows in the sheet when known up front (streaming ingest only)
+        self.expected_rows = None
+        self.duplicates_removed = 0
+        # Ingest counters surfaced in the summary stats
+        self.report = {'value_parse_failures': 0, 'date_parse_failures': 0, 'negative_values_dropped': 0}
         self.df = None
         self.stats = {}
+        self.cube = None
     
-    def load_and_process(self):
+    def load_and_process(self, canonicalize=True):
         """Load and process the Excel file"""
+        if isinstance(self.file_path, (list, tuple)):
+            return self._load_many(self.file_path)
+        
         try:
-            # Read Excel from uploaded file (BytesIO)
-            df = pd.read_excel(self.file_path)
-            
-            # Clean column names
-            df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+            if self.chunk_size or sniff_format(self.file_path) == 'xml':
+                # Streaming ingest: only one raw chunk is resident at a time
+                df = concat_frames(list(self.iter_processed_chunks()))
+            else:
+                with self.profiler.stage('read') as stage, open_register(self.file_path) as source:
+                    df = self._normalize_columns(pd.read_excel(source))
+                    stage.rows = len(df)
+                df = self._process_chunk(df, {})
             
-            # Map Tally column names
-            column_mapping = {
-                'particulars': 'buyer_name',
-                'buyer': 'buyer_name',
-                'buyer_name': 'buyer_name',
-                'value': 'value',
-                'amount': 'value',
-                'date': 'date',
-                'state': 'state'
-            }
-            
-            # Rename only existing columns
-            df = df.rename(columns={k: v for k, v in column_mapping.items() if k in df.columns})
-            
-            # Handle Tally format: forward fill empty cells
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'], errors='coerce')
-                df['date'] = df['date'].ffill()  # Use ffill() instead of fillna(method='ffill')
-            
-            if 'buyer_name' in df.columns:
-                df['buyer_name'] = df['buyer_name'].ffill()
+            if canonicalize:
+                df = self.canonicalize_buyers(df)
+            self.df = df
+            return df
             
-            if 'state' in df.columns:
-                df['state'] = df['state'].ffill()
+        except Exception as e:
+            raise Exception(f"Error processing Excel: {str(e)}")
+    
+    def _load_many(self, file_paths):
+        """Process several registers in parallel; forward-fill state never crosses files"""
+        if len(file_paths) == 1:
+            results = [_load_single(file_paths[0], self.chunk_size, self.catalog, self.profiler.enabled)]
+        else:
+            workers = min(len(file_paths), self.max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(_load_single, path, self.chunk_size, self.catalog, self.profiler.enabled)
+                    for path in file_paths
+                ]
+                for done, _ in enumerate(as_completed(futures), 1):
+                    self.profiler.notify('file_done', done)
+                results = [future.result() for future in futures]
+        
+        frames = [df for df, _, _ in results]
+        for _, report, records in results:
+            for key, count in report.items():
+                self.report[key] = self.report.get(key, 0) + count
+            self.profiler.extend(records)
+        
+        df, self.duplicates_removed = drop_duplicate_lines(frames)
+        self.df = self.canonicalize_buyers(df)
+        return self.df
+    
+    def iter_processed_chunks(self, chunk_size=None):
+        """Yield cleaned chunks, carrying forward-fill state across chunk boundaries"""
+        chunk_size = chunk_size or self.chunk_size or DEFAULT_CHUNK_SIZE
+        carry = {}
+        raw_chunks = self._iter_raw_chunks(chunk_size)
+        while True:
+            with self.profiler.stage('read') as stage:
+                raw = next(raw_chunks, None)
+                stage.rows = 0 if raw is None else len(raw)
+            if raw is None:
+                break
+            chunk = self._process_chunk(raw, carry)
+            if not chunk.empty:
+                yield chunk
+    
+    def _iter_raw_chunks(self, chunk_size):
+        """Read the register in row chunks with normalized column names"""
+        with open_register(self.file_path) as source:
+            yield from self._read_chunks(source, chunk_size)
+    
+    def _read_chunks(self, source, chunk_size):
+        """Row chunks of an open register
+        
+        Excel is read from the first sheet; Tally XML exports are parsed
+        voucher by voucher into the same columns.
+        """
+        fmt = sniff_format(source)
+        if fmt == 'xml':
+            yield from iter_voucher_frames(source, chunk_size)
+            return
+        
+        wb = None
+        if fmt != 'xls':
+            try:
+                wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+            except (zipfile.BadZipFile, InvalidFileException):
+                pass
+        if wb is None:
+            # Legacy .xls has no streaming reader - slice the full sheet instead
+            source.seek(0)
+            df = self._normalize_columns(pd.read_excel(source))
+            self.expected_rows = len(df)
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size].reset_index(drop=True)
+            return
+        
+        try:
+            sheet = wb.worksheets[0]
+            # Read from the sheet's dimension record; absent in some writers
+            self.expected_rows = sheet.max_row - 1 if sheet.max_row else None
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [f'Unnamed: {i}' if col is None else col for i, col in enumerate(header)]
             
-            # Clean value column
-            if 'value' in df.columns:
-                df['value'] = df['value'].astype(str).str.replace(r'[₹,\s]', '', regex=True)
-                df['value'] = pd.to_numeric(df['value'], errors='coerce')
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    yield self._normalize_columns(pd.DataFrame(buffer, columns=columns))
+                    buffer = []
+            if buffer:
+                yield self._normalize_columns(pd.DataFrame(buffer, columns=columns))
+        finally:
+            wb.close()
+    
+    def _normalize_columns(self, df):
+        """Clean column names and map Tally headers to the internal schema"""
+        df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+        
+        # Rename only existing columns
+        return df.rename(columns={k: v for k, v in COLUMN_MAPPING.items() if k in df.columns})
+    
+    def _ffill(self, series, carry, key):
+        """Forward fill a column, seeding it with the last value of the previous chunk"""
+        series = series.ffill()
+        if carry.get(key) is not None:
+            series = series.fillna(carry[key])
+        last = series.last_valid_index()
+        if last is not None:
+            carry[key] = series[last]
+        return series
+    
+    def _process_chunk(self, df, carry):
+        """Clean one block of normalized rows; carry holds forward-fill state"""
+        rows = len(df)
+        with self.profiler.stage('date', rows):
+            df = self._clean_dates(df, carry)
+        with self.profiler.stage('fill', rows):
+            df = self._fill_dimensions(df, carry)
+        with self.profiler.stage('value', rows):
+            df = self._clean_values(df)
+        with self.profiler.stage('item_detection', rows):
+            df = self._detect_items(df, carry)
+        with self.profiler.stage('time_dimensions', len(df)):
+            df = self._add_time_dimensions(df)
+        with self.profiler.stage('compact', len(df)):
+            return self._compact(df)
+    
+    def _clean_dates(self, df, carry):
+        """Parse the date column and forward fill it (Tally leaves item rows blank)"""
+        if 'date' in df.columns:
+            # Buffers have no path, so chunks of one upload share a key by identity
+            source = self.file_path if isinstance(self.file_path, str) else id(self.file_path)
+            df['date'], failures = parse_dates(df['date'], source)
+            self.report['date_parse_failures'] += failures
+            df['date'] = self._ffill(df['date'], carry, 'date')
+        return df
+    
+    def _fill_dimensions(self, df, carry):
+        """Handle Tally format: forward fill empty cells"""
+        if 'buyer_name' in df.columns:
+            df['buyer_name'] = self._ffill(df['buyer_name'], carry, 'buyer_name')
+        
+        if 'state' in df.columns:
+            df['state'] = self._ffill(df['state'], carry, 'state')
+        
+        if 'voucher_no' in df.columns:
+            df['voucher_no'] = self._ffill(df['voucher_no'], carry, 'voucher_no')
+        return df
+    
+    def _clean_values(self, df):
+        """Clean value column"""
+        if 'value' in df.columns:
+            df['value'], failures = parse_values(df['value'])
+            self.report['value_parse_failures'] += failures
+        return df
+    
+    def _detect_items(self, df, carry):
+        """Extract product names and clean buyer names"""
+        if 'buyer_name' in df.columns:
+            # Detect rows that contain product codes (items) and map them to catalog names
+            is_item, item_name = self.catalog.match(df['buyer_name'])
+            if 'is_item' in df.columns:
+                # XML exports mark stock-item lines; items outside the catalog keep their own name
+                item_name = np.where(is_item, item_name, df['buyer_name'].fillna('Unknown').astype(object))
+                item_name = np.where(df['is_item'], item_name, 'Unknown')
+            else:
+                df['is_item'] = is_item
             
-            # Extract product names and clean buyer names
-            if 'buyer_name' in df.columns:
-                # Detect rows that contain product codes (items)
-                df['is_item'] = df['buyer_name'].str.contains(
-                    r'Hydraulic|Broomer|CFGH|Gearbox', 
-                    case=False, 
-                    na=False
-                )
-                
-                # Clean buyer name (exclude item rows)
-                df['clean_buyer'] = np.where(df['is_item'], np.nan, df['buyer_name'])
-                df['clean_buyer'] = df['clean_buyer'].ffill()
-                
-                # Extract item name
-                df['item_name'] = np.where(df['is_item'], df['buyer_name'], 'Unknown')
-                
-                # Remove header rows with zero values
-                df = df[df['value'] > 0]
+            # Clean buyer name (exclude item rows)
+            df['clean_buyer'] = np.where(df['is_item'], np.nan, df['buyer_name'])
+            df['clean_buyer'] = self._ffill(df['clean_buyer'], carry, 'clean_buyer')
             
-            # Add time dimensions
-            if 'date' in df.columns:
-                df['year'] = df['date'].dt.year
-                df['month'] = df['date'].dt.month
-                df['month_name'] = df['date'].dt.month_name()
+            # Extract item name
+            df['item_name'] = item_name
             
-            self.df = df
+            # Remove header rows with zero values; negative amounts (e.g. credit notes) are counted
+            self.report['negative_values_dropped'] += int((df['value'] < 0).sum())
+            df = df[df['value'] > 0].copy()
+        return df
+    
+    @property
+    def aliases(self):
+        """Buyer alias table, read from disk the first time buyer names are canonicalized"""
+        if self._aliases is None:
+            self._aliases = BuyerAliases.load()
+        return self._aliases
+    
+    def canonicalize_buyers(self, df, recluster=False):
+        """Merge spelling variants of the same buyer in clean_buyer via the alias table"""
+        if df is None or 'clean_buyer' not in df.columns:
             return df
+        with self.profiler.stage('buyer_aliases', len(df)):
+            df['clean_buyer'] = self.aliases.canonicalize(df['clean_buyer'], recluster=recluster)
+            if self.aliases.changed:
+                self.aliases.save()
+        return df
+    
+    def _add_time_dimensions(self, df):
+        """Add time dimensions"""
+        if 'date' in df.columns:
+            df['year'] = df['date'].dt.year
+            df['month'] = df['date'].dt.month
+            df['month_name'] = df['date'].dt.month_name()
             
-        except Exception as e:
-            raise Exception(f"Error processing Excel: {str(e)}")
+            # Indian fiscal year runs April-March and is labelled by its starting year
+            df['fiscal_year'] = df['year'] - (df['month'] < 4)
+            df['fiscal_quarter'] = (df['month'] - 4) % 12 // 3 + 1
+        return df
+    
+    def _compact(self, df):
+        """Dictionary-encode text dimensions, narrow time columns, drop intermediates"""
+        # Filtered rows leave an Int64 index; a RangeIndex costs nothing
+        df = df.drop(columns=['is_item'], errors='ignore').reset_index(drop=True)
+        
+        if 'voucher_no' in df.columns:
+            df['voucher_no'] = voucher_text(df['voucher_no'])
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
+        if 'year' in df.columns:
+            df['year'] = df['year'].astype('Int16')
+        if 'month' in df.columns:
+            df['month'] = df['month'].astype('Int8')
+        if 'fiscal_year' in df.columns:
+            df['fiscal_year'] = df['fiscal_year'].astype('Int16')
+        if 'fiscal_quarter' in df.columns:
+            df['fiscal_quarter'] = df['fiscal_quarter'].astype('Int8')
+        if 'month_name' in df.columns:
+            df['month_name'] = pd.Categorical(df['month_name'], categories=MONTH_NAMES, ordered=True)
+        
+        return df
+    
+    def memory_usage(self):
+        """Return the processed frame's memory footprint in bytes"""
+        if self.df is None:
+            return 0
+        return int(self.df.memory_usage(deep=True).sum())
     
     def get_summary_stats(self):
         """Calculate summary statistics"""
         if self.df is None or self.df.empty:
             return {}
         
-        df = self.df
+        # One pass over the rows; every statistic rolls up from the cube
+        with self.profiler.stage('stats', len(self.df)):
+            self.cube = RollupCube.from_frame(self.df)
         
-        stats = {
-            'total_sales': float(df['value'].sum()) if 'value' in df.columns else 0,
-            'total_transactions': len(df),
-            'avg_transaction': float(df['value'].mean()) if 'value' in df.columns else 0,
-            'date_range': {
-                'start': df['date'].min() if 'date' in df.columns else None,
-                'end': df['date'].max() if 'date' in df.columns else None
-            },
-            'state_wise_sales': df.groupby('state')['value'].sum().to_dict() if 'state' in df.columns else {},
-            'buyer_wise_sales': df.groupby('clean_buyer')['value'].sum().to_dict() if 'clean_buyer' in df.columns else {}
-        }
+        stats = summarize(self.cube)
+        stats['memory_bytes'] = self.memory_usage()
+        stats['duplicates_removed'] = self.duplicates_removed
+        stats.update(self.report)
+        self.stats = stats
         
         return stats
     
+    def save(self, directory, store=False):
+        """Persist the processed rows, rollup cube and stats for later appends
+        
+        With store=True the rows are also written to an on-disk query store
+        (store.sqlite) that the dashboard can serve without loading them.
+        """
+        if self.cube is None:
+            self.get_summary_stats()
+        
+        os.makedirs(directory, exist_ok=True)
+        self.df.to_parquet(os.path.join(directory, 'data.parquet.tmp'), index=False)
+        with open(os.path.join(directory, 'aggregates.pkl.tmp'), 'wb') as f:
+            pickle.dump({'cube': self.cube, 'stats': self.stats}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        # Swap both files in only once everything is written
+        for name in ('data.parquet', 'aggregates.pkl'):
+            os.replace(os.path.join(directory, name + '.tmp'), os.path.join(directory, name))
+        
+        store_path = os.path.join(directory, STORE_FILE)
+        if store:
+            SalesStore.write(store_path, self.df, self.cube, self.stats)
+        elif os.path.exists(store_path):
+            # A store left from an earlier save would now be stale
+            os.remove(store_path)
+    
+    @classmethod
+    def from_processed(cls, df, stats, cube=None, aliases=None):
+        """Wrap an already processed frame (e.g. from the cache)"""
+        processor = cls(None, aliases=aliases)
+        processor.df = df
+        processor.stats = stats
+        processor.cube = cube
+        return processor
+    
+    @classmethod
+    def open_dataset(cls, directory, chunk_size=None):
+        """Load a dataset previously written with save()"""
+        processor = cls(directory, chunk_size=chunk_size)
+        try:
+            processor.df = pd.read_parquet(os.path.join(directory, 'data.parquet'))
+            with open(os.path.join(directory, 'aggregates.pkl'), 'rb') as f:
+                aggregates = pickle.load(f)
+        except Exception as e:
+            raise Exception(f"Error opening dataset: {str(e)}")
+        
+        processor.cube = aggregates['cube']
+        processor.stats = aggregates['stats']
+        if list(processor.cube.cells.columns[:len(CUBE_DIMENSIONS)]) != CUBE_DIMENSIONS:
+            # Saved by a version with a different cube layout
+            processor.cube = RollupCube.from_frame(processor.df)
+        return processor
+    
+    def append(self, file_path):
+        """Merge a new register into the processed dataset
+        
+        Only the new rows are cleaned. Existing rows dated inside the new
+        register's date range are replaced, and the cube and stats are
+        updated by delta instead of being rebuilt from every row.
+        """
+        new_processor = TallyDataProcessor(file_path, chunk_size=self.chunk_size, catalog=self.catalog, aliases=self._aliases)
+        new_df = new_processor.load_and_process()
+        self.report = new_processor.report
+        if new_df is None or new_df.empty:
+            return self.df
+        if self.cube is None:
+            self.get_summary_stats()
+        
+        new_cube = RollupCube.from_frame(new_df)
+        start, end = new_cube.date_range
+        
+        if self.df is None or self.df.empty:
+            kept, cube = None, new_cube
+        else:
+            if start is not None and 'date' in self.df.columns:
+                overlap = ((self.df['date'] >= start) & (self.df['date'] <= end)).to_numpy()
+            else:
+                overlap = np.zeros(len(self.df), dtype=bool)
+            
+            kept = self.df[~overlap]
+            cube = self.cube
+            if overlap.any():
+                cube = cube.combine(RollupCube.from_frame(self.df[overlap]), sign=-1)
+            cube = cube.combine(new_cube)
+            
+            # Replaced rows all fall inside the new range, so the bounds simply widen
+            old_start, old_end = self.cube.date_range
+            cube.date_range = (_bound(min, old_start, start), _bound(max, old_end, end))
+        
+        self.df = concat_frames([kept, new_df])
+        self.cube = cube
+        
+        stats = summarize(cube)
+        stats['memory_bytes'] = self.memory_usage()
+        stats['duplicates_removed'] = self.stats.get('duplicates_removed', 0)
+        stats.update(self.report)
+        self.stats = stats
+        return self.df
+    
     def get_dataframe(self):
         """Return processed dataframe"""
         return self.df
\ No newline at end of file
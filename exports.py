@@ -0,0 +1,139 @@
+import io
+
+# Download formats: key -> (label, file extension, MIME type)
+EXPORT_FORMATS = {
+    'csv': ("CSV", 'csv', 'text/csv'),
+    'xlsx': ("Excel", 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ("Parquet", 'parquet', 'application/vnd.apache.parquet'),
+    'arrow': ("Arrow IPC (Feather)", 'arrow', 'application/vnd.apache.arrow.file')
+}
+
+# Processing intermediates never offered for download
+INTERNAL_COLUMNS = ['buyer_name', 'is_item']
+
+# Columns selected for download unless the user picks others
+DEFAULT_EXPORT_COLUMNS = ['date', 'voucher_no', 'clean_buyer', 'state', 'item_name', 'value']
+
+# Arrow types for the narrow time columns (frames read from a store come back as int64/float64)
+COMPACT_TYPES = {
+    'year': 'int16',
+    'month': 'int8',
+    'fiscal_year': 'int16',
+    'fiscal_quarter': 'int8'
+}
+
+# Data rows per worksheet (Excel's limit less the header); longer exports continue on a new sheet
+MAX_SHEET_ROWS = 1048575
+
+
+def export_columns(columns):
+    """Columns of a dataset that can be downloaded"""
+    return [c for c in columns if c not in INTERNAL_COLUMNS]
+
+
+def default_columns(columns):
+    """Columns selected for download by default"""
+    return [c for c in DEFAULT_EXPORT_COLUMNS if c in columns]
+
+
+def write_csv(frames, out):
+    """CSV, encoded chunk by chunk"""
+    for i, frame in enumerate(frames):
+        out.write(frame.to_csv(index=False, header=i == 0).encode('utf-8'))
+
+
+def _new_sheet(wb, columns):
+    sheet = wb.create_sheet("Sales" if not wb.worksheets else f"Sales {len(wb.worksheets) + 1}")
+    sheet.append(list(columns))
+    return sheet
+
+
+def write_xlsx(frames, out):
+    """Excel workbook streamed row by row (openpyxl write-only mode)"""
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    sheet, rows = None, 0
+    for frame in frames:
+        # Plain Python values; missing cells stay empty
+        values = frame.astype(object).where(frame.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if sheet is None or rows == MAX_SHEET_ROWS:
+                sheet, rows = _new_sheet(wb, frame.columns), 0
+            sheet.append(row)
+            rows += 1
+        if sheet is None:
+            # An empty export still gets its header
+            sheet = _new_sheet(wb, frame.columns)
+    wb.save(out)
+
+
+def _arrow_tables(frames):
+    """Arrow tables for each frame, all cast to the schema of the first"""
+    import pyarrow as pa
+
+    schema = None
+    for frame in frames:
+        if schema is None:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            fields = []
+            for field in table.schema:
+                if field.name in COMPACT_TYPES:
+                    field = field.with_type(pa.type_for_alias(COMPACT_TYPES[field.name]))
+                elif pa.types.is_null(field.type):
+                    # Columns empty in the first chunk fall back to text
+                    field = field.with_type(pa.string())
+                fields.append(field)
+            schema = pa.schema(fields)
+        yield pa.Table.from_pandas(frame, schema=schema, preserve_index=False, safe=False)
+
+
+def write_parquet(frames, out):
+    """Parquet file with one row group per chunk; categoricals stay dictionary encoded"""
+    import pyarrow.parquet as pq
+
+    writer = None
+    for table in _arrow_tables(frames):
+        if writer is None:
+            writer = pq.ParquetWriter(out, table.schema, compression='zstd')
+        writer.write_table(table)
+    writer.close()
+
+
+def write_arrow(frames, out):
+    """Arrow IPC file (Feather v2) with one record batch per chunk"""
+    import pyarrow as pa
+
+    writer = None
+    for table in _arrow_tables(frames):
+        if writer is None:
+            writer = pa.ipc.new_file(out, table.schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+        writer.write_table(table)
+    writer.close()
+
+
+WRITERS = {
+    'csv': write_csv,
+    'xlsx': write_xlsx,
+    'parquet': write_parquet,
+    'arrow': write_arrow
+}
+
+
+def export_buffer(source, selection, columns, fmt):
+    """Download file for a selection of a TableIndex or SalesStore, as a BytesIO
+
+    Rows are fetched and written chunk by chunk, so only one chunk of rows
+    is resident besides the (compressed) output file. The buffer itself is
+    returned (and handed to st.download_button), so the file is never
+    copied out of it.
+    """
+    buffer = io.BytesIO()
+    WRITERS[fmt](source.iter_frames(selection, columns), buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def file_name(fmt, stem="tally_sales_data"):
+    """Download file name for a format"""
+    return f"{stem}.{EXPORT_FORMATS[fmt][1]}"
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# Series longer than this are downsampled before they are sent to the browser
+MAX_POINTS = 2000
+
+# Serialized figures kept per process
+MAX_CACHED_FIGURES = 256
+
+
+def lttb(x, y, threshold=MAX_POINTS):
+    """Largest-Triangle-Three-Buckets: positions of points that preserve the shape of y(x)"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    every = (n - 2) / (threshold - 2)
+
+    sampled = np.empty(threshold, dtype=np.intp)
+    sampled[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        sampled[i + 1] = a
+    sampled[-1] = n - 1
+    return sampled
+
+
+def downsample(frame, x, y, threshold=MAX_POINTS, group=None):
+    """Downsample a long-format frame per series (group column) with LTTB"""
+    if group is None:
+        if len(frame) <= threshold:
+            return frame
+        xs = frame[x].to_numpy()
+        if np.issubdtype(xs.dtype, np.datetime64):
+            xs = xs.astype('int64')
+        return frame.iloc[lttb(xs, frame[y].to_numpy(), threshold)]
+
+    parts = [downsample(part, x, y, threshold) for _, part in frame.groupby(group, sort=False)]
+    return pd.concat(parts) if parts else frame
+
+
+class FigureCache:
+    """LRU of serialized Plotly figure specs keyed by data fingerprint and chart parameters"""
+
+    def __init__(self, max_entries=MAX_CACHED_FIGURES):
+        self.max_entries = max_entries
+        self._specs = OrderedDict()
+        # Sessions run on their own threads; figures are built and parsed outside the lock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        """Return the cached figure for key, building and storing it on a miss"""
+        with self._lock:
+            spec = self._specs.get(key)
+            if spec is not None:
+                self._specs.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if spec is not None:
+            return pio.from_json(spec, skip_invalid=True)
+
+        fig = build()
+        spec = fig.to_json()
+        with self._lock:
+            self._specs[key] = spec
+            self._specs.move_to_end(key)
+            while len(self._specs) > self.max_entries:
+                self._specs.popitem(last=False)
+        return fig
+
+
+# Shared by every session; keys include the data fingerprint so datasets never mix
+FIGURE_CACHE = FigureCache()
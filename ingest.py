@@ -0,0 +1,168 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from data_processor import TallyDataProcessor, sniff_format
+from instrumentation import Profiler
+
+# Stages of one pass over the rows, in the order they run
+PIPELINE_STAGES = ['read', 'date', 'fill', 'value', 'item_detection', 'time_dimensions', 'compact']
+
+# Progress shown to the user while each stage runs
+STAGE_LABELS = {
+    'read': "Reading registers",
+    'date': "Parsing dates",
+    'fill': "Filling buyers and states",
+    'value': "Cleaning values",
+    'item_detection': "Detecting products",
+    'time_dimensions': "Adding time dimensions",
+    'compact': "Compacting",
+    'file_done': "Processing files in parallel",
+    'buyer_aliases': "Merging buyer name variants",
+    'stats': "Computing summary statistics"
+}
+
+# Share of the progress bar taken by row processing; the rest is stats
+PROCESSING_SHARE = 0.9
+
+# Uploads above this size reach worker processes as temporary files instead of pickled copies
+SPOOL_THRESHOLD_BYTES = 25 * 1024 * 1024
+
+
+def buffer_size(buffer):
+    """Size of a binary buffer in bytes, found by seeking (getbuffer() would copy a shared BytesIO)"""
+    position = buffer.tell()
+    size = buffer.seek(0, os.SEEK_END)
+    buffer.seek(position)
+    return size
+
+
+def spool(buffer):
+    """Write a buffer to a new uniquely named temporary file and return its path"""
+    fd, path = tempfile.mkstemp(prefix='tally_upload_', suffix=f".{sniff_format(buffer) or 'bin'}")
+    with os.fdopen(fd, 'wb') as f:
+        # Copied block by block, so the upload is never duplicated in memory
+        buffer.seek(0)
+        shutil.copyfileobj(buffer, f)
+    buffer.seek(0)
+    return path
+
+
+class IngestCancelled(Exception):
+    """Raised inside the worker when its job has been superseded"""
+
+
+class IngestJob:
+    """Processes registers on a background thread and reports progress per stage
+
+    The Streamlit script polls progress and the result; the job survives
+    reruns, so widget interaction never restarts the processing.
+    `finished` is set as soon as the dataset is shared in memory; the
+    disk cache is written afterwards on the same thread.
+    Registers are paths or in-memory buffers (e.g. io.BytesIO over the
+    uploaded bytes). Buffers are read in place; only large ones handed to
+    worker processes are spooled to temporary files, removed when the job
+    ends.
+    """
+
+    def __init__(self, key, sources, cache, chunk_size=None, catalog=None, profiler=None):
+        self.key = key
+        self.sources = sources
+        self.cache = cache
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.profiler.listener = self._on_stage
+        self.spooled = []
+        # A single register is processed in this process so every stage reports progress
+        if len(sources) == 1:
+            source = sources[0]
+        else:
+            source = [self._spool(s) for s in sources]
+        self.processor = TallyDataProcessor(source, chunk_size=chunk_size, catalog=catalog, profiler=self.profiler)
+
+        self.stage = None
+        self.progress = 0.0
+        self.rows = 0
+        self.handle = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.stats_ready_seconds = None
+        self.persisted_seconds = None
+        self.finished = threading.Event()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ingest-{key[:8]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop at the next stage boundary"""
+        self._cancelled.set()
+
+    @property
+    def label(self):
+        return STAGE_LABELS.get(self.stage, "Starting")
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def _spool(self, source):
+        if isinstance(source, str) or buffer_size(source) <= SPOOL_THRESHOLD_BYTES:
+            return source
+        path = spool(source)
+        self.spooled.append(path)
+        return path
+
+    def _on_stage(self, name, rows):
+        if self._cancelled.is_set():
+            raise IngestCancelled()
+        self.stage = name
+
+        if name == 'stats':
+            progress = PROCESSING_SHARE
+        elif name == 'file_done':
+            progress = PROCESSING_SHARE * rows / len(self.sources)
+        else:
+            if name == 'compact' and rows:
+                self.rows += rows
+            expected = self.processor.expected_rows
+            if expected:
+                progress = PROCESSING_SHARE * min(1.0, self.rows / expected)
+            elif name in PIPELINE_STAGES:
+                progress = PROCESSING_SHARE * PIPELINE_STAGES.index(name) / len(PIPELINE_STAGES)
+            else:
+                progress = self.progress
+        # Chunks cycle through the stages, so never move backwards
+        self.progress = max(self.progress, progress)
+
+    def _run(self):
+        df = stats = None
+        try:
+            df = self.processor.load_and_process()
+            if df is not None and not df.empty:
+                stats = self.processor.get_summary_stats()
+                # Shared in memory first, so the dashboard renders before the disk write
+                self.handle = self.cache.register(self.key, df, stats, self.processor.cube)
+                self.stats_ready_seconds = self.elapsed()
+            self.progress = 1.0
+        except Exception as e:
+            # Cancellation surfaces wrapped by the processor's own error handling
+            if not self._cancelled.is_set():
+                self.error = str(e)
+        finally:
+            # The worker only needs the processor and its inputs while it runs
+            self.processor = None
+            self.sources = [None] * len(self.sources)
+            for path in self.spooled:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.finished.set()
+
+        # Persisting to the disk cache happens after the script has been signalled
+        if self.handle is not None:
+            self.cache.persist(self.key, df, stats)
+            self.persisted_seconds = self.elapsed()
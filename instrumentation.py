@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from datetime import datetime
+from functools import wraps
+
+# Structured diagnostics log (one JSON object per line)
+DIAGNOSTICS_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "diagnostics.jsonl")
+
+# Live MemoryTrace tokens; tracing runs while there is at least one
+_tracing_tokens = 0
+# Re-entrant: a token may be collected (and released) while the lock is held
+_tracing_lock = threading.RLock()
+
+
+class MemoryTrace:
+    """Token keeping tracemalloc running for as long as it is referenced"""
+
+
+def _untrace():
+    global _tracing_tokens
+    with _tracing_lock:
+        _tracing_tokens -= 1
+        if not _tracing_tokens and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def trace_memory():
+    """Start tracemalloc if needed and return a token that keeps it running
+
+    Tracing is process-wide and slows every allocation, so it is started
+    for the first token and stopped once the last one is garbage collected
+    (e.g. dropped from session state, or its session ends); stages only
+    ever sample it.
+    """
+    global _tracing_tokens
+    token = MemoryTrace()
+    with _tracing_lock:
+        _tracing_tokens += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    weakref.finalize(token, _untrace)
+    return token
+
+
+class _NullStage:
+    """Stage context used while profiling is off - does nothing"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name, rows):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        # Sampled, never reset: other threads and sessions share the tracer
+        self._memory = None
+        if self.profiler.track_memory and tracemalloc.is_tracing():
+            self._memory = tracemalloc.get_traced_memory()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._started
+        delta = peak = None
+        if self._memory is not None and tracemalloc.is_tracing():
+            current, high = tracemalloc.get_traced_memory()
+            delta = current - self._memory[0]
+            # The peak is only known when the process reached a new high during the stage
+            if high > self._memory[1]:
+                peak = high - self._memory[0]
+        self.profiler.records.append({
+            'stage': self.name,
+            'seconds': seconds,
+            'memory_bytes': delta,
+            'peak_bytes': peak,
+            'rows': self.rows
+        })
+        return False
+
+
+class Profiler:
+    """Per-stage wall time, row counts and traced memory deltas
+
+    Stages are opened with `with profiler.stage(name) as s: ...; s.rows = n`.
+    A disabled profiler hands out a shared no-op context, so instrumented
+    code costs one method call per stage. An optional listener is called
+    with (name, rows) as each stage starts, whether or not recording is on,
+    and is how progress is reported. Memory is the change in the whole
+    process's traced memory over each stage (other sessions included) and
+    the peak above its start when a new high was reached; it is only
+    recorded while a trace_memory() token keeps tracing on.
+    """
+
+    def __init__(self, enabled=False, track_memory=True, listener=None):
+        self.enabled = enabled
+        self.track_memory = enabled and track_memory
+        self.listener = listener
+        self.records = []
+
+    def stage(self, name, rows=None):
+        if self.listener is not None:
+            self.listener(name, rows)
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows)
+
+    def notify(self, name, rows=None):
+        """Report a progress event to the listener without recording a stage"""
+        if self.listener is not None:
+            self.listener(name, rows)
+
+    def extend(self, records, prefix=''):
+        """Merge records collected elsewhere (e.g. in a worker process)"""
+        if self.enabled:
+            self.records.extend(dict(r, stage=prefix + r['stage']) for r in records)
+
+    def summary(self):
+        """Records aggregated by stage name, in first-seen order"""
+        totals = {}
+        for r in self.records:
+            t = totals.setdefault(r['stage'], {
+                'stage': r['stage'], 'calls': 0, 'seconds': 0.0, 'memory_bytes': None, 'peak_bytes': None, 'rows': None
+            })
+            t['calls'] += 1
+            t['seconds'] += r['seconds']
+            for key in ('memory_bytes', 'peak_bytes'):
+                if r.get(key) is not None:
+                    t[key] = r[key] if t[key] is None else max(t[key], r[key])
+            if r['rows'] is not None:
+                t['rows'] = (t['rows'] or 0) + r['rows']
+        return list(totals.values())
+
+    def write_log(self, path=DIAGNOSTICS_LOG, **context):
+        """Append this run's stage summary to a JSON-lines log"""
+        if not self.records:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'timestamp': datetime.now().isoformat(timespec='seconds'), **context, 'stages': self.summary()}
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, default=str) + '\n')
+
+
+def instrumented(name):
+    """Method decorator timing the call as a stage of self.profiler"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
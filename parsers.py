@@ -0,0 +1,183 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Sign applied to amounts carrying a Tally Dr/Cr suffix when signed parsing is asked for
+DR_CR_SIGNS = {'dr': -1.0, 'cr': 1.0}
+
+# Off by default: Dr/Cr only says which side of the voucher an amount sits on (the party
+# line of a sale is a debit), so the register value is its magnitude, as in XML ingest
+SIGNED_DR_CR = False
+
+_CURRENCY = re.compile(r'(₹|rs\.?|inr)', re.IGNORECASE)
+_DR_CR = re.compile(r'\s*(dr|cr)\.?$', re.IGNORECASE)
+
+
+def parse_amount(text, signed=SIGNED_DR_CR):
+    """Parse one Tally amount string; returns NaN when it is not a number
+
+    A Dr/Cr suffix is dropped, or with signed=True makes Dr amounts negative.
+    """
+    s = str(text).strip()
+    sign = 1.0
+
+    m = _DR_CR.search(s)
+    if m:
+        if signed:
+            sign = DR_CR_SIGNS[m.group(1).lower()]
+        s = s[:m.start()]
+
+    s = _CURRENCY.sub('', s).replace(',', '')
+    s = ''.join(s.split())
+
+    # Accounting style negatives: (1,234.00)
+    if s.startswith('(') and s.endswith(')'):
+        sign = -sign
+        s = s[1:-1]
+
+    try:
+        return sign * float(s)
+    except ValueError:
+        return np.nan
+
+
+def parse_values(series, signed=SIGNED_DR_CR):
+    """Convert a value column to numbers; returns (values, rows that failed to parse)
+
+    Native numeric columns are returned untouched. In object columns the
+    numbers and plain numeric strings go through pandas' C converter, and only
+    the remaining distinct strings are cleaned (currency symbols, thousands
+    separators, Dr/Cr suffixes, parenthesised negatives).
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series, 0
+
+    values = pd.to_numeric(series, errors='coerce')
+    pending = (series.notna() & values.isna()).to_numpy()
+    if not pending.any():
+        return values, 0
+
+    codes, uniques = pd.factorize(series[pending])
+    parsed = np.array([parse_amount(u, signed) for u in uniques], dtype='float64')
+    # Blank cells are missing values, not parse failures
+    blank = np.array([str(u).strip() == '' for u in uniques], dtype=bool)
+
+    result = values.to_numpy(dtype='float64', copy=True)
+    result[pending] = parsed[codes]
+    failures = int((np.isnan(parsed) & ~blank)[codes].sum())
+    return pd.Series(result, index=series.index, name=series.name), failures
+
+
+# Excel stores dates as days since 1899-12-30 (including the 1900 leap-year bug)
+EXCEL_EPOCH = '1899-12-30'
+MAX_EXCEL_SERIAL = 2958465
+
+# Tally date layouts, tried in order (day-first, as exported in India)
+DATE_FORMATS = [
+    '%d-%b-%Y', '%d-%b-%y', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y', '%d-%m-%y',
+    '%d/%m/%y', '%d %b %Y', '%d-%B-%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y%m%d'
+]
+
+# Date format inferred per source, reused by later chunks and re-uploads
+_source_formats = {}
+
+_FORMAT_SAMPLE = 50
+
+
+def _parsed_share(strings, fmt):
+    sample = pd.Series(strings[:_FORMAT_SAMPLE], dtype=object)
+    return pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean()
+
+
+def infer_date_format(strings):
+    """Known format that parses most of a sample of the strings, or None"""
+    best, best_share = None, 0.0
+    for fmt in DATE_FORMATS:
+        share = _parsed_share(strings, fmt)
+        if share > best_share:
+            best, best_share = fmt, share
+            if share == 1.0:
+                break
+    return best
+
+
+def _serials_to_dates(numbers):
+    numbers = pd.Series(numbers, dtype='float64')
+    # Integers like 20240401 are compact yyyymmdd dates, not serials
+    compact = numbers.between(19000101, 29991231)
+    serial = numbers.where(numbers.between(1, MAX_EXCEL_SERIAL))
+    dates = pd.to_datetime(serial, unit='D', origin=EXCEL_EPOCH, errors='coerce')
+    if compact.any():
+        dates[compact] = pd.to_datetime(
+            numbers[compact].astype('int64').astype(str), format='%Y%m%d', errors='coerce'
+        )
+    return dates
+
+
+def _strings_to_dates(strings, source):
+    fmt = _source_formats.get(source)
+    if fmt is None or _parsed_share(strings, fmt) < 0.5:
+        fmt = infer_date_format(strings)
+        if source is not None and fmt is not None:
+            if len(_source_formats) > 256:
+                _source_formats.clear()
+            _source_formats[source] = fmt
+
+    strings = pd.Series(strings, dtype=object)
+    if fmt is not None:
+        dates = pd.to_datetime(strings, format=fmt, errors='coerce')
+    else:
+        dates = pd.Series(pd.NaT, index=strings.index, dtype='datetime64[ns]')
+
+    # Stragglers in another layout fall back to (day-first) inference
+    missing = dates.isna().to_numpy()
+    if missing.any():
+        dates[missing] = [pd.to_datetime(s, dayfirst=True, errors='coerce') for s in strings[missing]]
+    return dates
+
+
+def parse_dates(series, source=None):
+    """Convert a date column to datetime64; returns (dates, rows that failed to parse)
+
+    Native datetimes pass through and numeric columns are read as Excel serials.
+    Object columns are factorized so only distinct cells are converted; the
+    string layout is inferred once per source from a sample and remembered.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series, 0
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        dates = _serials_to_dates(series.to_numpy())
+        dates.index = series.index
+        return dates, int((series.notna() & dates.isna()).sum())
+
+    codes, uniques = pd.factorize(series)
+    if not len(uniques):
+        return pd.Series(pd.NaT, index=series.index, name=series.name, dtype='datetime64[ns]'), 0
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype='datetime64[ns]')
+
+    kinds = np.array([
+        'date' if hasattr(u, 'year') else 'number' if isinstance(u, (int, float, np.number)) else 'text'
+        for u in uniques
+    ])
+    if (kinds == 'date').any():
+        parsed[kinds == 'date'] = pd.to_datetime(list(uniques[kinds == 'date']), errors='coerce')
+    if (kinds == 'number').any():
+        parsed[kinds == 'number'] = _serials_to_dates(uniques[kinds == 'number'].astype('float64')).to_numpy()
+    text = kinds == 'text'
+    if text.any():
+        strings = np.array([str(u).strip() for u in uniques[text]], dtype=object)
+        blank = strings == ''
+        parsed_text = pd.Series(pd.NaT, index=range(len(strings)), dtype='datetime64[ns]')
+        if (~blank).any():
+            parsed_text[~blank] = _strings_to_dates(strings[~blank], source).to_numpy()
+        parsed[text] = parsed_text.to_numpy()
+        # Blank cells are missing values, not parse failures
+        kinds[text] = np.where(blank, 'blank', 'text')
+
+    failed_unique = parsed.isna().to_numpy() & (kinds != 'blank')
+    values = parsed.to_numpy()[np.maximum(codes, 0)]
+    values[codes < 0] = np.datetime64('NaT')
+    failures = int(failed_unique[codes[codes >= 0]].sum())
+    return pd.Series(values, index=series.index, name=series.name), failures
@@ -0,0 +1,115 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+# Total bytes of processed datasets kept in memory across all sessions
+MAX_MEMORY_BYTES = int(os.environ.get('TALLY_MEMORY_BUDGET_MB', 1024)) * 1024 ** 2
+
+
+def dataset_bytes(df, cube=None):
+    """Approximate in-memory size of a processed frame and its cube"""
+    size = int(df.memory_usage(deep=True).sum()) if df is not None else 0
+    if cube is not None:
+        size += int(cube.cells.memory_usage(deep=True).sum())
+    return size
+
+
+class DatasetHandle:
+    """A session's reference to a shared dataset; the frame must be treated as read-only"""
+
+    def __init__(self, key, df, stats, cube):
+        self.key = key
+        self.df = df
+        self.stats = stats
+        self.cube = cube
+
+
+class _Entry:
+    def __init__(self, df, stats, cube, nbytes):
+        self.df = df
+        self.stats = stats
+        self.cube = cube
+        self.nbytes = nbytes
+        self.refs = 0
+
+
+class DatasetRegistry:
+    """Process-wide processed datasets keyed by content hash, shared by every session
+
+    Sessions hold DatasetHandles; an entry's reference count drops when its
+    handle is garbage collected (e.g. the session ends or loads another
+    file). Over the memory budget, least-recently-used entries that no
+    session references are evicted; referenced entries are never dropped.
+    """
+
+    def __init__(self, max_bytes=MAX_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        # Re-entrant: a handle may be collected (and released) while the lock is held
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _handle(self, key, entry):
+        # Caller holds the lock
+        entry.refs += 1
+        self._entries.move_to_end(key)
+        handle = DatasetHandle(key, entry.df, entry.stats, entry.cube)
+        weakref.finalize(handle, self._release, key, entry)
+        return handle
+
+    def acquire(self, key):
+        """Handle on a registered dataset, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._handle(key, entry)
+
+    def register(self, key, df, stats, cube):
+        """Add a dataset and return a handle on it
+
+        If another session registered the same key meanwhile, its copy is
+        kept and shared instead.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(df, stats, cube, dataset_bytes(df, cube))
+                self._entries[key] = entry
+            handle = self._handle(key, entry)
+            self._evict()
+            return handle
+
+    def _release(self, key, entry):
+        with self._lock:
+            entry.refs -= 1
+            if self._entries.get(key) is entry:
+                self._evict()
+
+    def _evict(self):
+        """Drop unreferenced entries, oldest first, until the budget is met (caller holds the lock)"""
+        total = sum(e.nbytes for e in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries.get(key)
+            if entry is None or entry.refs > 0:
+                continue
+            del self._entries[key]
+            total -= entry.nbytes
+
+    def usage(self):
+        """Counters for the sidebar indicator"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'in_use': sum(1 for e in self._entries.values() if e.refs > 0),
+                'bytes': sum(e.nbytes for e in self._entries.values()),
+                'max_bytes': self.max_bytes
+            }
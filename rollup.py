@@ -0,0 +1,154 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from timebuckets import GRANULARITIES, TimeBuckets, bucket_starts, day_codes
+
+# Cube dimensions, in storage order; time is stored at day grain
+CUBE_DIMENSIONS = ['day', 'state', 'clean_buyer', 'item_name']
+
+
+def _stored(dim):
+    """Cube column holding a dimension (every time granularity rolls up from 'day')"""
+    return 'day' if dim in GRANULARITIES else dim
+
+
+class RollupCube:
+    """Pre-aggregated sum/count cube that any dashboard view can be rolled up from"""
+
+    def __init__(self, cells, labels, date_range=(None, None)):
+        # cells: one row per observed (day, state, clean_buyer, item_name) code combination
+        self.cells = cells
+        # labels: dimension -> Index mapping codes back to values (None for day codes)
+        self.labels = labels
+        self.date_range = date_range
+        # Week/month/quarter/fiscal-year codes for every cell, computed once
+        self.buckets = TimeBuckets(cells['day'].to_numpy())
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the cube with a single groupby over the processed rows"""
+        codes = {}
+        labels = {}
+        for dim in CUBE_DIMENSIONS:
+            if dim == 'day':
+                if 'date' in df.columns:
+                    codes[dim] = day_codes(df['date'])
+                else:
+                    codes[dim] = np.full(len(df), -1, dtype='int32')
+                labels[dim] = None
+            elif dim in df.columns:
+                col = df[dim]
+                if not isinstance(col.dtype, pd.CategoricalDtype):
+                    col = col.astype('category')
+                codes[dim] = col.cat.codes.to_numpy()
+                labels[dim] = col.cat.categories
+            else:
+                codes[dim] = np.full(len(df), -1, dtype='int8')
+                labels[dim] = pd.Index([])
+
+        frame = pd.DataFrame(codes)
+        frame['value'] = df['value'].to_numpy() if 'value' in df.columns else 0.0
+        cells = frame.groupby(CUBE_DIMENSIONS, sort=False).agg(
+            value=('value', 'sum'),
+            count=('value', 'size')
+        ).reset_index()
+
+        date_range = (None, None)
+        if 'date' in df.columns and len(df):
+            date_range = (df['date'].min(), df['date'].max())
+
+        return cls(cells, labels, date_range)
+
+    def fingerprint(self):
+        """Content hash of the cube, computed once (cubes are never mutated in place)"""
+        if getattr(self, '_fingerprint', None) is None:
+            h = hashlib.sha256(pd.util.hash_pandas_object(self.cells, index=False).to_numpy().tobytes())
+            for dim in CUBE_DIMENSIONS:
+                if self.labels[dim] is not None:
+                    h.update(pd.util.hash_array(self.labels[dim].astype(str).to_numpy()).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def has(self, dim):
+        """True if the dimension has at least one known value"""
+        return bool(len(self.cells)) and bool((self.cells[_stored(dim)] >= 0).any())
+
+    def total(self):
+        """Return (total value, row count)"""
+        return float(self.cells['value'].sum()), int(self.cells['count'].sum())
+
+    def rollup(self, dims):
+        """Aggregate to a subset of dimensions, dropping unknown members
+        
+        Time dimensions may be any granularity ('day', 'week', 'month',
+        'quarter', 'fiscal_year'); coarser ones are looked up from day codes.
+        """
+        dims = list(dims)
+        stored = list(dict.fromkeys(_stored(dim) for dim in dims))
+        positions = np.flatnonzero((self.cells[stored] >= 0).all(axis=1).to_numpy())
+        keys = {}
+        for dim in dims:
+            if dim in GRANULARITIES:
+                keys[dim] = self.buckets.lookup(dim, positions)
+            else:
+                keys[dim] = self.cells[dim].to_numpy()[positions]
+        cells = pd.DataFrame(keys)
+        cells['value'] = self.cells['value'].to_numpy()[positions]
+        cells['count'] = self.cells['count'].to_numpy()[positions]
+        grouped = cells.groupby(dims, sort=False)[['value', 'count']].sum().reset_index()
+        for dim in dims:
+            grouped[dim] = self._decode(dim, grouped[dim].to_numpy())
+        return grouped
+
+    def combine(self, other, sign=1):
+        """Add (sign=1) or subtract (sign=-1) another cube's cells without touching raw rows"""
+        labels = {}
+        other_cells = other.cells.copy()
+        for dim in CUBE_DIMENSIONS:
+            if dim == 'day':
+                labels[dim] = None
+                continue
+            # Keep this cube's codes stable and append unseen members
+            mine, theirs = self.labels[dim], other.labels[dim]
+            labels[dim] = mine.append(theirs.difference(mine))
+            remap = labels[dim].get_indexer(theirs)
+            codes = other_cells[dim].to_numpy()
+            other_cells[dim] = np.where(codes >= 0, remap[np.maximum(codes, 0)] if len(remap) else -1, -1)
+
+        other_cells['value'] = other_cells['value'] * sign
+        other_cells['count'] = other_cells['count'] * sign
+        cells = pd.concat([self.cells, other_cells], ignore_index=True)
+        cells = cells.groupby(CUBE_DIMENSIONS, sort=False)[['value', 'count']].sum().reset_index()
+        cells = cells[cells['count'] != 0].reset_index(drop=True)
+        return RollupCube(cells, labels, self.date_range)
+
+    def _decode(self, dim, codes):
+        if dim in GRANULARITIES:
+            return bucket_starts(codes, dim)
+        return self.labels[dim].take(codes)
+
+
+def summarize(cube):
+    """Summary statistics derived from the cube"""
+    total_sales, total_transactions = cube.total()
+    start, end = cube.date_range
+
+    def by(dim):
+        if cube.labels[dim] is not None and not len(cube.labels[dim]):
+            return {}
+        data = cube.rollup([dim])
+        return dict(zip(data[dim], data['value']))
+
+    return {
+        'total_sales': total_sales,
+        'total_transactions': total_transactions,
+        'avg_transaction': total_sales / total_transactions if total_transactions else 0,
+        'date_range': {
+            'start': start,
+            'end': end
+        },
+        'state_wise_sales': by('state'),
+        'buyer_wise_sales': by('clean_buyer')
+    }
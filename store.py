@@ -0,0 +1,247 @@
+import os
+import pickle
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from rollup import CUBE_DIMENSIONS
+from timebuckets import GRANULARITIES, bucket_starts
+
+# File name of the store inside a saved dataset directory
+STORE_FILE = 'store.sqlite'
+
+# Bump when the table layout changes; older stores are ignored until re-saved
+STORE_LAYOUT = 2
+
+# Rows written per INSERT batch when building a store
+WRITE_CHUNK_ROWS = 50000
+
+# Rows fetched per round trip when exporting
+EXPORT_CHUNK_ROWS = 100000
+
+# Row columns that get an index for filtering and sorting
+INDEXED_COLUMNS = ['date', 'state', 'clean_buyer']
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_values(chunk):
+    """Frame chunk as plain Python values SQLite can bind (datetimes as epoch seconds)"""
+    columns = []
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            seconds = series.to_numpy().astype('datetime64[s]').astype('int64')
+            values = np.where(series.isna().to_numpy(), None, seconds).astype(object)
+        else:
+            values = series.astype(object).where(series.notna(), None).to_numpy()
+        columns.append(values)
+    return list(zip(*columns))
+
+
+class SalesStore:
+    """Processed register persisted in an on-disk SQLite file
+
+    Exposes the RollupCube interface (rollup, has, total, fingerprint,
+    date_range) plus filtered, sorted row pages, so the dashboard can run
+    without the rows being resident in memory. Every query returns only
+    result-sized data. Stores are written once and never modified in place.
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self._rollups = {}
+        meta = dict(self._query("SELECT key, value FROM meta"))
+        if int(meta.get('layout', 1)) != STORE_LAYOUT:
+            raise ValueError(f"{path} was written by an older version; save the dataset again")
+        self.columns = pickle.loads(meta['columns'])
+        self.datetime_columns = pickle.loads(meta['datetime_columns'])
+        self.stats = pickle.loads(meta['stats'])
+        self.date_range = pickle.loads(meta['date_range'])
+        self._fingerprint = meta['fingerprint'].decode()
+
+    @classmethod
+    def write(cls, path, df, cube, stats):
+        """Write rows, cube cells and stats to a new store file, replacing any existing one"""
+        tmp = path + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+        con = sqlite3.connect(tmp)
+        try:
+            columns = list(df.columns)
+            datetime_columns = [c for c in columns if pd.api.types.is_datetime64_any_dtype(df[c].dtype)]
+            con.execute(f"CREATE TABLE rows ({', '.join(_quote(c) for c in columns)})")
+            insert = f"INSERT INTO rows VALUES ({', '.join('?' * len(columns))})"
+            for start in range(0, len(df), WRITE_CHUNK_ROWS):
+                con.executemany(insert, _sql_values(df.iloc[start:start + WRITE_CHUNK_ROWS]))
+            for col in INDEXED_COLUMNS:
+                if col in columns:
+                    con.execute(f"CREATE INDEX rows_{col} ON rows ({_quote(col)})")
+
+            # Cube cells stored decoded (day codes as is); unknown members become NULL
+            cells = pd.DataFrame({
+                dim: cube.cells[dim].to_numpy() if dim == 'day' else cube._decode(dim, cube.cells[dim].to_numpy())
+                for dim in CUBE_DIMENSIONS
+            })
+            for dim in CUBE_DIMENSIONS:
+                cells[dim] = cells[dim].where(cube.cells[dim].to_numpy() >= 0)
+            cells['day'] = cells['day'].astype('Int64')
+            cells['value'] = cube.cells['value'].to_numpy()
+            cells['count'] = cube.cells['count'].to_numpy()
+            con.execute(f"CREATE TABLE cells ({', '.join(_quote(c) for c in cells.columns)})")
+            con.executemany(f"INSERT INTO cells VALUES ({', '.join('?' * cells.shape[1])})", _sql_values(cells))
+
+            # Bucket code of every known day, so any granularity is a join away
+            buckets = cube.buckets.table()
+            con.execute(f"CREATE TABLE buckets ({', '.join(_quote(c) for c in GRANULARITIES)}, PRIMARY KEY (day))")
+            con.executemany(f"INSERT INTO buckets VALUES ({', '.join('?' * len(GRANULARITIES))})", _sql_values(buckets))
+
+            con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value BLOB)")
+            con.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('columns', pickle.dumps(columns)),
+                ('datetime_columns', pickle.dumps(datetime_columns)),
+                ('stats', pickle.dumps(stats)),
+                ('date_range', pickle.dumps(cube.date_range)),
+                ('fingerprint', cube.fingerprint().encode()),
+                ('layout', STORE_LAYOUT)
+            ])
+            con.commit()
+        finally:
+            con.close()
+
+        os.replace(tmp, path)
+        return cls(path)
+
+    def _connect(self):
+        # One read-only connection per call keeps the store safe to share across sessions
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def _query(self, sql, params=()):
+        con = self._connect()
+        try:
+            return con.execute(sql, params).fetchall()
+        finally:
+            con.close()
+
+    def _frame(self, sql, params, columns):
+        """Run a row query and restore the column dtypes"""
+        con = self._connect()
+        try:
+            frame = pd.read_sql_query(sql, con, params=params)
+        finally:
+            con.close()
+        return self._restore(frame, columns)
+
+    def _restore(self, frame, columns):
+        frame.columns = columns
+        for col in columns:
+            if col in self.datetime_columns:
+                frame[col] = pd.to_datetime(frame[col], unit='s')
+        return frame
+
+    # ---------- Cube interface ----------
+    def fingerprint(self):
+        """Fingerprint of the cube the store was written from"""
+        return self._fingerprint
+
+    @staticmethod
+    def is_current(path):
+        """True if a store file exists and has the current table layout"""
+        try:
+            SalesStore(path)
+        except (OSError, ValueError, sqlite3.Error):
+            return False
+        return True
+
+    def has(self, dim):
+        """True if the dimension has at least one known value"""
+        column = 'day' if dim in GRANULARITIES else dim
+        return bool(self._query(f"SELECT 1 FROM cells WHERE {_quote(column)} IS NOT NULL LIMIT 1"))
+
+    def total(self):
+        """Return (total value, row count)"""
+        value, count = self._query("SELECT SUM(value), SUM(count) FROM cells")[0]
+        return float(value or 0), int(count or 0)
+
+    def rollup(self, dims):
+        """Aggregate to a subset of dimensions, dropping unknown members"""
+        dims = list(dims)
+        key = tuple(dims)
+        if key not in self._rollups:
+            # Time granularities come from the bucket table, other dimensions from the cells
+            columns = [f"b.{_quote(d)}" if d in GRANULARITIES else f"c.{_quote(d)}" for d in dims]
+            sql = f"SELECT {', '.join(columns + ['SUM(c.value)', 'SUM(c.count)'])} FROM cells c"
+            if any(d in GRANULARITIES for d in dims):
+                sql += " JOIN buckets b ON b.day = c.day"
+            if dims:
+                sql += " WHERE " + ' AND '.join(f"{c} IS NOT NULL" for c in columns)
+                sql += " GROUP BY " + ', '.join(columns)
+            grouped = pd.DataFrame(self._query(sql), columns=dims + ['value', 'count'])
+            for dim in dims:
+                if dim in GRANULARITIES:
+                    grouped[dim] = bucket_starts(grouped[dim].astype('int64'), dim)
+            self._rollups[key] = grouped
+        return self._rollups[key].copy()
+
+    # ---------- Table interface (mirrors TableIndex) ----------
+    def values(self, col):
+        """Filter choices for a column, sorted"""
+        if col not in self.columns:
+            return []
+        rows = self._query(f"SELECT DISTINCT {_quote(col)} FROM rows WHERE {_quote(col)} IS NOT NULL")
+        return sorted((r[0] for r in rows), key=str)
+
+    def select(self, filters, column=None, ascending=True):
+        """Query selecting the rows matching {column: value}, optionally ordered by a column"""
+        clauses, params = [], []
+        for col, value in filters.items():
+            if value is None or value == 'All' or col not in self.columns:
+                continue
+            clauses.append(f"{_quote(col)} = ?")
+            params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        # Same order as TableIndex.sort: stable, missing values last (first when descending)
+        if column is None:
+            order = " ORDER BY rowid"
+        elif ascending:
+            order = f" ORDER BY {_quote(column)} IS NULL, {_quote(column)}, rowid"
+        else:
+            order = f" ORDER BY {_quote(column)} IS NOT NULL, {_quote(column)} DESC, rowid DESC"
+        return where, tuple(params), order
+
+    def count(self, selection):
+        """Number of rows in a selection"""
+        where, params, _ = selection
+        return self._query(f"SELECT COUNT(*) FROM rows{where}", params)[0][0]
+
+    def page(self, selection, page, page_size, columns):
+        """Rows for one page (1-based) of a selection"""
+        where, params, order = selection
+        select = ', '.join(_quote(c) for c in columns)
+        sql = f"SELECT {select} FROM rows{where}{order} LIMIT ? OFFSET ?"
+        return self._frame(sql, params + (page_size, (page - 1) * page_size), list(columns))
+
+    def iter_frames(self, selection, columns=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Rows of a selection as frames, fetched chunk by chunk (one empty frame when nothing matches)"""
+        where, params, order = selection
+        columns = list(columns) if columns is not None else list(self.columns)
+        con = self._connect()
+        try:
+            cursor = con.execute(f"SELECT {', '.join(_quote(c) for c in columns)} FROM rows{where}{order}", params)
+            rows, first = cursor.fetchmany(chunk_rows), True
+            while rows or first:
+                yield self._restore(pd.DataFrame.from_records(rows, columns=columns), columns)
+                rows, first = cursor.fetchmany(chunk_rows), False
+        finally:
+            con.close()
+
+    def size_bytes(self):
+        """Size of the store file on disk"""
+        return os.path.getsize(self.path)
@@ -0,0 +1,134 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Columns the data table can be filtered on
+FILTER_COLUMNS = ['state', 'clean_buyer']
+
+# Rows per chunk when building an export
+EXPORT_CHUNK_ROWS = 100000
+
+# Sorted selections kept per index, so reruns and page flips skip the sort
+SORT_CACHE_SIZE = 16
+
+# Indexes shared by every session viewing the same frame, dropped with the frame
+_indexes = {}
+
+
+class TableIndex:
+    """Precomputed row positions per filter value, plus paging and sorting"""
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        # Only a weak reference: the shared index must not keep a released frame alive
+        self._df = weakref.ref(df)
+        self._sorted = OrderedDict()
+        self._lock = threading.Lock()
+        self.positions = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            series = df[col]
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype('category')
+            codes = series.cat.codes.to_numpy()
+
+            # Group row positions by code with one stable sort
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+            start = int((codes < 0).sum())
+            groups = {}
+            for label, count in zip(series.cat.categories, counts):
+                if count:
+                    groups[label] = order[start:start + count]
+                start += count
+            self.positions[col] = groups
+
+    @property
+    def df(self):
+        return self._df()
+
+    @classmethod
+    def for_frame(cls, df):
+        """Index for a frame, built once and reused until the frame is released"""
+        key = id(df)
+        entry = _indexes.get(key)
+        if entry is not None and entry.df is df:
+            return entry
+        index = cls(df)
+        _indexes[key] = index
+        weakref.finalize(df, _indexes.pop, key, None)
+        return index
+
+    def values(self, col):
+        """Filter choices for a column, sorted"""
+        return sorted(self.positions.get(col, {}), key=str)
+
+    def lookup(self, filters):
+        """Row positions matching {column: value}; 'All' or None means no filter"""
+        result = None
+        for col, value in filters.items():
+            if value is None or value == 'All' or col not in self.positions:
+                continue
+            rows = self.positions[col].get(value, np.array([], dtype=np.intp))
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+        if result is None:
+            return np.arange(len(self.df))
+        return np.sort(result)
+
+    def sort(self, positions, column, ascending=True):
+        """Order row positions by a column without materialising the rows"""
+        series = self.df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Rank categories by label so codes sort alphabetically
+            ranks = np.argsort(np.argsort(series.cat.categories.astype(str)))
+            codes = series.cat.codes.to_numpy()[positions]
+            keys = np.where(codes >= 0, ranks[np.maximum(codes, 0)] if len(ranks) else 0, len(ranks))
+        else:
+            keys = series.to_numpy()[positions]
+        order = np.argsort(keys, kind='stable')
+        if not ascending:
+            order = order[::-1]
+        return positions[order]
+
+    def select(self, filters, column=None, ascending=True):
+        """Row positions matching filters, optionally ordered by a column
+
+        Sorted selections are cached (read-only), so reruns with the same
+        filters and order, e.g. page flips, are a dictionary lookup.
+        """
+        if column is None:
+            return self.lookup(filters)
+
+        active = tuple(sorted((c, v) for c, v in filters.items() if v is not None and v != 'All'))
+        key = (active, column, ascending)
+        with self._lock:
+            positions = self._sorted.get(key)
+            if positions is not None:
+                self._sorted.move_to_end(key)
+                return positions
+
+        positions = self.sort(self.lookup(filters), column, ascending)
+        positions.flags.writeable = False
+        with self._lock:
+            self._sorted[key] = positions
+            while len(self._sorted) > SORT_CACHE_SIZE:
+                self._sorted.popitem(last=False)
+        return positions
+
+    def count(self, positions):
+        """Number of rows in a selection"""
+        return len(positions)
+
+    def page(self, positions, page, page_size, columns):
+        """Rows for one page (1-based) of the given positions"""
+        start = (page - 1) * page_size
+        return self.df.iloc[positions[start:start + page_size]][columns]
+
+    def iter_frames(self, positions, columns=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Rows of a selection as frames of at most chunk_rows (one empty frame when nothing matches)"""
+        columns = list(columns) if columns is not None else list(self.df.columns)
+        for start in range(0, max(len(positions), 1), chunk_rows):
+            yield self.df.iloc[positions[start:start + chunk_rows]][columns]
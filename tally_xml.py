@@ -0,0 +1,135 @@
+import codecs
+import itertools
+import re
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+# Raw columns produced for each voucher line, in the internal schema
+XML_COLUMNS = ['date', 'voucher_no', 'buyer_name', 'state', 'value', 'is_item']
+
+# Bytes read per parser feed
+READ_BYTES = 1 << 20
+
+# Elements holding the state of supply, in order of preference
+STATE_TAGS = ['STATENAME', 'PLACEOFSUPPLY', 'CONSIGNEESTATENAME']
+
+# Inventory lines are listed under either tag depending on the Tally release
+INVENTORY_TAGS = {'ALLINVENTORYENTRIES.LIST', 'INVENTORYENTRIES.LIST'}
+
+# Tally writes control characters as references XML 1.0 does not allow (e.g. &#4;)
+_INVALID_REF = re.compile(r'&#(?:x0*(?:[0-8bcef]|1[0-9a-f])|0*(?:[0-8]|1[124-9]|2[0-9]|3[01]));', re.IGNORECASE)
+_PARTIAL_REF = re.compile(r'&#?[0-9a-fA-Fx]*$')
+
+_BOMS = [
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16')
+]
+
+
+def _text(elem, tag):
+    value = elem.findtext(tag)
+    return value.strip() if value and value.strip() else None
+
+
+def _amount(text):
+    # Tally signs debits negative; a sales line is credited, so the magnitude is the value
+    try:
+        return abs(float(text))
+    except (TypeError, ValueError):
+        return text
+
+
+def voucher_rows(voucher):
+    """Register rows for one VOUCHER element: the voucher line, then one line per stock item"""
+    if (_text(voucher, 'ISCANCELLED') or '').lower() == 'yes' or voucher.get('ACTION') == 'Delete':
+        return []
+
+    date = _text(voucher, 'DATE')
+    number = _text(voucher, 'VOUCHERNUMBER')
+    state = next((s for s in (_text(voucher, t) for t in STATE_TAGS) if s), None)
+    party = _text(voucher, 'PARTYLEDGERNAME') or _text(voucher, 'PARTYNAME')
+
+    items, party_amount = [], None
+    for child in voucher:
+        if child.tag in INVENTORY_TAGS:
+            items.append((_text(child, 'STOCKITEMNAME'), _amount(_text(child, 'AMOUNT'))))
+        elif child.tag == 'LEDGERENTRIES.LIST' and party_amount is None:
+            if (_text(child, 'ISPARTYLEDGER') or '').lower() == 'yes' or _text(child, 'LEDGERNAME') == party:
+                party_amount = _amount(_text(child, 'AMOUNT'))
+    if party_amount is None:
+        party_amount = sum(v for _, v in items if isinstance(v, float))
+
+    rows = [(date, number, party, state, party_amount, False)]
+    rows += [(date, number, name, state, value, True) for name, value in items]
+    return rows
+
+
+def _iter_text(source):
+    """Decoded text blocks of a path or binary buffer, the encoding taken from its byte-order mark"""
+    stream = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        if not isinstance(source, str):
+            stream.seek(0)
+        head = stream.read(READ_BYTES)
+        encoding = next((enc for bom, enc in _BOMS if head.startswith(bom)), 'utf-8')
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        while head:
+            yield decoder.decode(head)
+            head = stream.read(READ_BYTES)
+        yield decoder.decode(b'', final=True)
+    finally:
+        if isinstance(source, str):
+            stream.close()
+
+
+def iter_voucher_frames(source, chunk_size):
+    """Yield raw register frames of about chunk_size rows from a Tally XML export
+
+    The document is fed to an incremental parser block by block. Each
+    VOUCHER is turned into rows when it closes and is then dropped from the
+    tree together with the finished elements around it, so memory stays
+    constant however large the export is. Rows carry the voucher's date,
+    number, party and state on every line and flag stock-item lines.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    path = []
+    vouchers_open = 0
+    buffer = []
+    pending = ''
+
+    for block in itertools.chain(_iter_text(source), [None]):
+        text = pending + (block or '')
+        # A reference split across blocks is completed by the next one
+        partial = _PARTIAL_REF.search(text) if block is not None else None
+        pending = text[partial.start():] if partial else ''
+        if partial:
+            text = text[:partial.start()]
+        parser.feed(_INVALID_REF.sub('', text))
+        if block is None:
+            parser.close()
+
+        for event, elem in parser.read_events():
+            if event == 'start':
+                path.append(elem)
+                vouchers_open += elem.tag == 'VOUCHER'
+                continue
+            path.pop()
+            if elem.tag == 'VOUCHER':
+                vouchers_open -= 1
+                buffer.extend(voucher_rows(elem))
+            elif vouchers_open:
+                # Lines inside an open voucher are read when it closes
+                continue
+            # Finished elements are dropped from the tree, so it never grows
+            if path:
+                path[-1].remove(elem)
+            elem.clear()
+
+        while len(buffer) >= chunk_size:
+            yield pd.DataFrame(buffer[:chunk_size], columns=XML_COLUMNS)
+            buffer = buffer[chunk_size:]
+
+    if buffer:
+        yield pd.DataFrame(buffer, columns=XML_COLUMNS)
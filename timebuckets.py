@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# Day codes count days from the Excel epoch (a Saturday), so real register dates are >= 0
+DAY_EPOCH = np.datetime64('1899-12-30', 'D')
+
+# Supported granularities, finest first
+GRANULARITIES = ['day', 'week', 'month', 'quarter', 'fiscal_year']
+
+GRANULARITY_LABELS = {
+    'day': "Daily",
+    'week': "Weekly",
+    'month': "Monthly",
+    'quarter': "Quarterly",
+    'fiscal_year': "Fiscal Year"
+}
+
+
+def day_codes(dates):
+    """Day codes for a datetime series (-1 where the date is missing)"""
+    days = dates.to_numpy().astype('datetime64[D]')
+    codes = (days - DAY_EPOCH).astype('int64')
+    codes[np.isnat(days) | (codes < 0)] = -1
+    return codes.astype('int32')
+
+
+def bucket_codes(days, granularity):
+    """Integer bucket codes for (known) day codes at a granularity"""
+    days = np.asarray(days, dtype='int64')
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        # ISO weeks start on Monday; the epoch falls on a Saturday
+        return (days + 5) // 7
+
+    months = (DAY_EPOCH + days.astype('timedelta64[D]')).astype('datetime64[M]').astype('int64')
+    if granularity == 'month':
+        return months
+    if granularity == 'quarter':
+        return months // 3
+    if granularity == 'fiscal_year':
+        # Indian fiscal year runs April-March
+        return (months - 3) // 12
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_starts(codes, granularity):
+    """First day of each bucket as a DatetimeIndex"""
+    codes = np.asarray(codes, dtype='int64')
+    if granularity == 'day':
+        starts = DAY_EPOCH + codes.astype('timedelta64[D]')
+    elif granularity == 'week':
+        starts = DAY_EPOCH + (codes * 7 - 5).astype('timedelta64[D]')
+    elif granularity == 'month':
+        starts = codes.astype('datetime64[M]')
+    elif granularity == 'quarter':
+        starts = (codes * 3).astype('datetime64[M]')
+    elif granularity == 'fiscal_year':
+        starts = (codes * 12 + 3).astype('datetime64[M]')
+    else:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    return pd.DatetimeIndex(starts.astype('datetime64[ns]'))
+
+
+class TimeBuckets:
+    """Bucket codes for every granularity, precomputed for a set of day codes
+
+    Codes are computed once over the distinct days; switching granularity
+    is then an array lookup.
+    """
+
+    def __init__(self, days):
+        self.days, self.inverse = np.unique(np.asarray(days), return_inverse=True)
+        known = self.days >= 0
+        self.codes = {}
+        for granularity in GRANULARITIES:
+            codes = np.full(len(self.days), -1, dtype='int64')
+            codes[known] = bucket_codes(self.days[known], granularity)
+            self.codes[granularity] = codes
+
+    def lookup(self, granularity, positions=None):
+        """Bucket code of each input day (or of the days at the given positions)"""
+        inverse = self.inverse if positions is None else self.inverse[positions]
+        return self.codes[granularity][inverse]
+
+    def table(self):
+        """Known days with their bucket codes, one column per granularity"""
+        known = self.days >= 0
+        return pd.DataFrame({g: self.codes[g][known] for g in GRANULARITIES})